@@ -1,11 +1,48 @@
 import argparse
+import asyncio
+import contextlib
+import gzip
+import io
+import os
+import shelve
+import sys
+import threading
+import urllib.error
 import urllib.request
 import urllib.parse
-import xml.etree.ElementTree as ET
 import csv
 from datetime import datetime
 
-def query_arxiv(search_query, start=0, max_results=10, sort_by='relevance', sort_order='descending'):
+# Prefer lxml's libxml2-backed parser, fall back to the stdlib implementation
+try:
+    from lxml import etree as ET
+except ImportError:
+    import xml.etree.ElementTree as ET
+
+# lxml can filter by tag, precompile XPath and unlink processed siblings; the stdlib parser can't
+USING_LXML = hasattr(ET, 'LXML_VERSION')
+
+# aiohttp lets result pages download concurrently; without it pages are fetched in worker threads
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+# Namespace definitions
+ATOM_NS = 'http://www.w3.org/2005/Atom'
+OPENSEARCH_NS = 'http://a9.com/-/spec/opensearch/1.1/'
+NAMESPACES = {'atom': ATOM_NS, 'opensearch': OPENSEARCH_NS}
+ENTRY_TAG = f'{{{ATOM_NS}}}entry'
+NO_RESULTS = "No results found for your search query."
+# Atom XML is very repetitive, so asking for gzip cuts the transfer to a fraction
+REQUEST_HEADERS = {'Accept-Encoding': 'gzip', 'User-Agent': 'arxiv-search/1.0'}
+# arXiv's API terms ask for no more than one request every 3 seconds
+REQUEST_INTERVAL = 3.0
+# Responses are kept with their ETag/Last-Modified so repeat queries become conditional GETs
+CACHE_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'arxiv-search', 'responses')
+_cache_lock = threading.Lock()  # shelve isn't safe for concurrent writers
+
+def build_query_url(search_query, start=0, max_results=10, sort_by='relevance', sort_order='descending'):
     base_url = 'http://export.arxiv.org/api/query?'
     query_params = {
         'search_query': search_query,
@@ -14,96 +51,372 @@ def query_arxiv(search_query, start=0, max_results=10, sort_by='relevance', sort
         'sortBy': sort_by,
         'sortOrder': sort_order
     }
-    url = base_url + urllib.parse.urlencode(query_params)
-    response = urllib.request.urlopen(url)
-    return response.read().decode('utf-8')
+    return base_url + urllib.parse.urlencode(query_params)
 
-def parse_arxiv_response(xml_response):
-    root = ET.fromstring(xml_response)
-    
-    # Namespace definition
-    namespace = {'atom': 'http://www.w3.org/2005/Atom', 'opensearch': 'http://a9.com/-/spec/opensearch/1.1/'}
-    
-    # Get total results
-    total_results = root.find('.//opensearch:totalResults', namespace).text
-    if int(total_results) == 0:
-        return "No results found for your search query."
-    
-    # Parse entries with additional metadata
-    entries = []
-    for entry in root.findall('.//atom:entry', namespace):
-        paper = {
-            'title': entry.find('atom:title', namespace).text.strip(),
-            'authors': [author.find('atom:name', namespace).text for author in entry.findall('atom:author', namespace)],
-            'summary': entry.find('atom:summary', namespace).text.strip(),
-            'link': entry.find('./atom:link[@title="pdf"]', namespace).get('href') if entry.find('./atom:link[@title="pdf"]', namespace) is not None else entry.find('atom:id', namespace).text,
-            'published': entry.find('atom:published', namespace).text[:10],
-            'updated': entry.find('atom:updated', namespace).text[:10],  # Add updated date
-            'comment': entry.find('atom:comment', namespace).text if entry.find('atom:comment', namespace) is not None else "N/A",
-            'journal_ref': entry.find('atom:journal_ref', namespace).text if entry.find('atom:journal_ref', namespace) is not None else "N/A"
+def _cache_get(url):
+    with _cache_lock:
+        try:
+            with shelve.open(CACHE_PATH, flag='r') as cache:
+                return cache.get(url)
+        except Exception:
+            return None  # No cache yet, or unreadable
+
+def _cache_put(url, etag, last_modified, body):
+    with _cache_lock:
+        try:
+            os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+            with shelve.open(CACHE_PATH) as cache:
+                cache[url] = {'etag': etag, 'last_modified': last_modified, 'body': body}
+        except Exception as e:
+            print(f"Error caching response: {str(e)}")
+
+def _request_headers(cached):
+    headers = dict(REQUEST_HEADERS)
+    if cached:
+        if cached['etag']:
+            headers['If-None-Match'] = cached['etag']
+        if cached['last_modified']:
+            headers['If-Modified-Since'] = cached['last_modified']
+    return headers
+
+class _CachingReader:
+    """Pass reads through while keeping a copy of the body, cached once it has been read to the end"""
+    def __init__(self, stream, on_complete):
+        self._stream = stream
+        self._chunks = []
+        self._on_complete = on_complete
+
+    def read(self, size=-1):
+        data = self._stream.read(size)
+        if data:
+            self._chunks.append(data)
+        if self._on_complete is not None and (not data or size is None or size < 0):
+            self._on_complete(b''.join(self._chunks))
+            self._on_complete = None
+        return data
+
+def _decoded(response):
+    # Only decompress when the server actually honoured Accept-Encoding
+    if response.headers.get('Content-Encoding') == 'gzip':
+        return gzip.GzipFile(fileobj=response)
+    return response
+
+@contextlib.contextmanager
+def open_arxiv(url, use_cache=True):
+    """Open a decoded response stream, answering from the cache when the server says it's unchanged"""
+    cached = _cache_get(url) if use_cache else None
+    try:
+        response = urllib.request.urlopen(urllib.request.Request(url, headers=_request_headers(cached)))
+    except urllib.error.HTTPError as e:
+        if not (cached and e.code == 304):
+            raise
+        response = None
+
+    if response is None:
+        yield io.BytesIO(cached['body'])
+        return
+
+    with response:
+        stream = _decoded(response)
+        etag, last_modified = response.headers.get('ETag'), response.headers.get('Last-Modified')
+        if use_cache and (etag or last_modified):
+            stream = _CachingReader(stream, lambda body: _cache_put(url, etag, last_modified, body))
+        yield stream
+
+def query_arxiv(search_query, start=0, max_results=10, sort_by='relevance', sort_order='descending', use_cache=True):
+    url = build_query_url(search_query, start, max_results, sort_by, sort_order)
+    with open_arxiv(url, use_cache) as stream:
+        return stream.read().decode('utf-8')
+
+if USING_LXML:
+    # Compiled once; smart_strings=False keeps results from pinning the parsed tree in memory
+    def _xpath(path):
+        return ET.XPath(path, namespaces=NAMESPACES, smart_strings=False)
+
+    _title = _xpath('string(atom:title)')
+    _author_names = _xpath('atom:author/atom:name/text()')
+    _summary = _xpath('string(atom:summary)')
+    _pdf_link = _xpath('atom:link[@title="pdf"]/@href')
+    _id_link = _xpath('string(atom:id)')
+    _published = _xpath('string(atom:published)')
+    _updated = _xpath('string(atom:updated)')
+    _comment = _xpath('string(atom:comment)')
+    _journal_ref = _xpath('string(atom:journal_ref)')
+
+    def parse_entry(entry):
+        pdf = _pdf_link(entry)
+        return {
+            'title': _title(entry).strip(),
+            'authors': _author_names(entry),
+            'summary': _summary(entry).strip(),
+            'link': pdf[0] if pdf else _id_link(entry),
+            'published': _published(entry)[:10],
+            'updated': _updated(entry)[:10],
+            'comment': _comment(entry) or "N/A",
+            'journal_ref': _journal_ref(entry) or "N/A"
         }
-        entries.append(paper)
-    
+
+else:
+    def _optional_text(entry, path):
+        elem = entry.find(path, NAMESPACES)
+        return elem.text if elem is not None else "N/A"
+
+    def parse_entry(entry):
+        pdf = entry.find('./atom:link[@title="pdf"]', NAMESPACES)
+        return {
+            'title': entry.find('atom:title', NAMESPACES).text.strip(),
+            'authors': [author.text for author in entry.iterfind('atom:author/atom:name', NAMESPACES)],
+            'summary': entry.find('atom:summary', NAMESPACES).text.strip(),
+            'link': pdf.get('href') if pdf is not None else entry.find('atom:id', NAMESPACES).text,
+            'published': entry.find('atom:published', NAMESPACES).text[:10],
+            'updated': entry.find('atom:updated', NAMESPACES).text[:10],  # Add updated date
+            'comment': _optional_text(entry, 'atom:comment'),
+            'journal_ref': _optional_text(entry, 'atom:journal_ref')
+        }
+
+def _release(elem):
+    # Free the parsed entry, and with lxml also the siblings already handled
+    elem.clear()
+    if USING_LXML:
+        while elem.getprevious() is not None:
+            del elem.getparent()[0]
+
+def iter_entries(stream):
+    """Yield papers from a file-like Atom feed as each entry finishes parsing"""
+    if USING_LXML:
+        context = ET.iterparse(stream, events=('end',), tag=ENTRY_TAG)
+    else:
+        context = ET.iterparse(stream, events=('end',))
+
+    for _, elem in context:
+        if elem.tag != ENTRY_TAG:
+            continue
+        yield parse_entry(elem)
+        _release(elem)
+
+def iter_arxiv_entries(url, use_cache=True):
+    """Stream papers straight from the arXiv API so parsing overlaps the download"""
+    with open_arxiv(url, use_cache) as stream:
+        yield from iter_entries(stream)
+
+async def _fetch_page(session, url, use_cache=True):
+    """Download one page with aiohttp, parsing entries as chunks arrive"""
+    cached = _cache_get(url) if use_cache else None
+    if USING_LXML:
+        parser = ET.XMLPullParser(events=('end',), tag=ENTRY_TAG)
+    else:
+        parser = ET.XMLPullParser(events=('end',))
+
+    entries = []
+    async with session.get(url, headers=_request_headers(cached)) as response:
+        if cached and response.status == 304:
+            return list(iter_entries(io.BytesIO(cached['body'])))
+        response.raise_for_status()
+
+        etag, last_modified = response.headers.get('ETag'), response.headers.get('Last-Modified')
+        keep = use_cache and (etag or last_modified)
+        chunks = []
+        # aiohttp undoes the gzip transfer encoding itself
+        async for chunk in response.content.iter_chunked(64 * 1024):
+            if keep:
+                chunks.append(chunk)
+            parser.feed(chunk)
+            for _, elem in parser.read_events():
+                if elem.tag == ENTRY_TAG:
+                    entries.append(parse_entry(elem))
+                    _release(elem)
+    parser.close()
+
+    if keep:
+        _cache_put(url, etag, last_modified, b''.join(chunks))
+    return entries
+
+async def query_arxiv_pages(search_query, total, page_size=100, start=0, sort_by='relevance', sort_order='descending', max_concurrency=5, use_cache=True):
+    """
+    Fetch `total` results as pages of `page_size`, with up to `max_concurrency` requests in flight.
+    Request starts are still spaced REQUEST_INTERVAL apart, so the overlap comes from each page's
+    latency and download running alongside the next ones. Returns the papers in result order.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    loop = asyncio.get_running_loop()
+    next_slot = loop.time()
+
+    async def fetch(session, offset):
+        nonlocal next_slot
+        url = build_query_url(search_query, offset, min(page_size, start + total - offset), sort_by, sort_order)
+        async with semaphore:
+            now = loop.time()
+            delay = max(0.0, next_slot - now)
+            next_slot = max(now, next_slot) + REQUEST_INTERVAL
+            await asyncio.sleep(delay)
+
+            if session is None:
+                return await asyncio.to_thread(lambda: list(iter_arxiv_entries(url, use_cache)))
+            return await _fetch_page(session, url, use_cache)
+
+    offsets = range(start, start + total, page_size)
+    if aiohttp is None:
+        pages = await asyncio.gather(*(fetch(None, offset) for offset in offsets))
+    else:
+        async with aiohttp.ClientSession() as session:
+            pages = await asyncio.gather(*(fetch(session, offset) for offset in offsets))
+
+    return [paper for page in pages for paper in page]
+
+def parse_arxiv_response(xml_response):
+    entries = list(iter_entries(io.BytesIO(xml_response.encode('utf-8'))))
+    if not entries:
+        return NO_RESULTS
+
     return entries
 
+# ANSI color codes
+title_color = '\033[1;34m'  # Bold Blue
+author_color = '\033[0;32m'  # Green
+date_color = '\033[0;36m'  # Cyan
+link_color = '\033[1;35m'  # Magenta
+summary_color = '\033[0;37m'  # White
+reset_color = '\033[0m'  # Reset
+
+# Assembled once so each paper is a single format call and a single write
+PAPER_TEMPLATE = (
+    f"{title_color}[{{i}}] {{title}}{reset_color}\n"
+    f"{author_color}Authors:{reset_color} {{authors}}\n"
+    f"{date_color}Published:{reset_color} {{published}}\n"
+    f"{date_color}Updated:{reset_color} {{updated}}\n"
+    f"{summary_color}Journal Reference:{reset_color} {{journal_ref}}\n"
+    f"{summary_color}Comment:{reset_color} {{comment}}\n"
+    f"{link_color}Link:{reset_color} {{link}}\n"
+    f"{summary_color}Summary:{reset_color} {{summary}}...\n"
+    "\n" + "="*80 + "\n\n"
+)
+
+def display_paper(i, paper):
+    sys.stdout.write(PAPER_TEMPLATE.format(
+        i=i,
+        title=paper['title'],
+        authors=', '.join(paper['authors']),
+        published=paper['published'],
+        updated=paper['updated'],
+        journal_ref=paper['journal_ref'],
+        comment=paper['comment'],
+        link=paper['link'],
+        summary=paper['summary'][:200]  # Show first 200 chars of summary
+    ))
+
 def display_results(entries):
     if isinstance(entries, str):
         print(entries)
         return
+
+    # Entries may be a stream, so print each as it arrives and report the count at the end
+    count = 0
+    for count, paper in enumerate(entries, 1):
+        if count == 1:
+            print()
+        display_paper(count, paper)
+
+    if count == 0:
+        print(NO_RESULTS)
+    else:
+        print(f"Found {count} results.")
+
+def _output_filename(filename, extension):
+    # If no filename provided, create one with timestamp
+    if not filename:
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        filename = f'arxiv_results_{timestamp}{extension}'
     
-    # ANSI color codes
-    title_color = '\033[1;34m'  # Bold Blue
-    author_color = '\033[0;32m'  # Green
-    date_color = '\033[0;36m'  # Cyan
-    link_color = '\033[1;35m'  # Magenta
-    summary_color = '\033[0;37m'  # White
-    reset_color = '\033[0m'  # Reset
-
-    print(f"\nFound {len(entries)} results:\n")
-    for i, paper in enumerate(entries, 1):
-        print(f"{title_color}[{i}] {paper['title']}{reset_color}")
-        print(f"{author_color}Authors:{reset_color} {', '.join(paper['authors'])}")
-        print(f"{date_color}Published:{reset_color} {paper['published']}")
-        print(f"{date_color}Updated:{reset_color} {paper['updated']}")
-        print(f"{summary_color}Journal Reference:{reset_color} {paper['journal_ref']}")
-        print(f"{summary_color}Comment:{reset_color} {paper['comment']}")
-        print(f"{link_color}Link:{reset_color} {paper['link']}")
-        print(f"{summary_color}Summary:{reset_color} {paper['summary'][:200]}...")  # Show first 200 chars of summary
-        print("\n" + "="*80 + "\n")
+    # Add extension if not present
+    if not filename.endswith(extension):
+        filename += extension
+
+    return filename
+
+# Columns written by the CSV and Parquet savers
+OUTPUT_FIELDS = ('title', 'authors', 'published', 'link', 'summary')
+
+def _output_row(paper):
+    # Flatten a paper once into a plain tuple in OUTPUT_FIELDS order
+    return (paper['title'], '; '.join(paper['authors']), paper['published'], paper['link'], paper['summary'])
+
+def _open_csv_writer(filename):
+    try:
+        csvfile = open(filename, 'w', newline='', encoding='utf-8')
+    except OSError as e:
+        print(f"Error saving to CSV: {str(e)}")
+        return None, None
+
+    writer = csv.writer(csvfile)
+    writer.writerow(OUTPUT_FIELDS)
+    return csvfile, writer
+
+def write_csv_rows(entries, filename):
+    """Write each paper to CSV as it streams past, passing it on to the caller"""
+    if isinstance(entries, str):
+        print(f"No results to save: {entries}")
+        return
+
+    filename = _output_filename(filename, '.csv')
+    csvfile = writer = None
+    started = False
+    try:
+        for paper in entries:
+            # Open lazily so an empty result set doesn't leave a header-only file behind
+            if not started:
+                csvfile, writer = _open_csv_writer(filename)
+                started = True
 
+            if writer is not None:
+                writer.writerow(_output_row(paper))
+            yield paper
+    finally:
+        if csvfile is not None:
+            csvfile.close()
 
+    if not started:
+        print(f"No results to save: {NO_RESULTS}")
+    elif writer is not None:
+        print(f"\nResults saved to: {filename}")
 
 def save_to_csv(entries, filename):
+    for _ in write_csv_rows(entries, filename):
+        pass
+
+def write_parquet_rows(entries, filename):
+    """Collect papers as they stream past and write them to a zstd-compressed Parquet file at the end"""
     if isinstance(entries, str):
         print(f"No results to save: {entries}")
         return
-        
-    # If no filename provided, create one with timestamp
-    if not filename:
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f'arxiv_results_{timestamp}.csv'
-    
-    # Add .csv extension if not present
-    if not filename.endswith('.csv'):
-        filename += '.csv'
-    
+
+    filename = _output_filename(filename, '.parquet')
+    rows = []
+    for paper in entries:
+        rows.append(_output_row(paper))
+        yield paper
+
+    if not rows:
+        print(f"No results to save: {NO_RESULTS}")
+        return
+
     try:
-        with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-            fieldnames = ['title', 'authors', 'published', 'link', 'summary']
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            
-            writer.writeheader()
-            for paper in entries:
-                writer.writerow({
-                    'title': paper['title'],
-                    'authors': '; '.join(paper['authors']),
-                    'published': paper['published'],
-                    'link': paper['link'],
-                    'summary': paper['summary']
-                })
+        import pandas as pd
+        pd.DataFrame.from_records(rows, columns=OUTPUT_FIELDS).to_parquet(filename, index=False, compression='zstd')
         print(f"\nResults saved to: {filename}")
+    except ImportError as e:
+        print(f"Error saving to Parquet, pandas and pyarrow are required: {str(e)}")
     except Exception as e:
-        print(f"Error saving to CSV: {str(e)}")
+        print(f"Error saving to Parquet: {str(e)}")
+
+def save_to_parquet(entries, filename):
+    for _ in write_parquet_rows(entries, filename):
+        pass
+
+def positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return number
 
 def main():
     parser = argparse.ArgumentParser(
@@ -111,7 +424,9 @@ def main():
         epilog='Example usage:\n'
                '  python review_bot.py "cat:cs.AI+OR+cat:cs.LG" --max_results 5 --sort_by submittedDate\n'
                '  python review_bot.py "ti:quantum+OR+ti:relativity" --sort_order ascending\n'
-               '  python review_bot.py "all:geology" --save_csv results.csv\n\n'
+               '  python review_bot.py "all:geology" --save_csv results.csv\n'
+               '  python review_bot.py "all:geology" --max_results 1000 --page_size 200\n'
+               '  python review_bot.py "all:geology" --save_parquet results.parquet\n\n'
                'Search Fields:\n'
                '  ti: Title\n'
                '  au: Author\n'
@@ -129,19 +444,27 @@ def main():
     parser.add_argument('search_query', type=str, help='The search query for arXiv. Combine fields and terms using logical operators.')
     parser.add_argument('--start', type=int, default=0, help='The starting index for results (default: 0).')
     parser.add_argument('--max_results', type=int, default=10, help='The maximum number of results to return (default: 10).')
+    parser.add_argument('--page_size', type=positive_int, default=100, help='Results per API request; larger searches fetch pages concurrently (default: 100).')
     parser.add_argument('--sort_by', type=str, choices=['relevance', 'lastUpdatedDate', 'submittedDate'], default='relevance', help='Sort by field (default: relevance).')
     parser.add_argument('--sort_order', type=str, choices=['ascending', 'descending'], default='descending', help='Sort order (default: descending).')
+    parser.add_argument('--no_cache', action='store_true', help='Always download fresh results instead of revalidating cached responses.')
     parser.add_argument('--save_csv', type=str, nargs='?', const='', 
                        help='Save results to CSV file. Optionally specify filename, otherwise timestamp will be used.')
+    parser.add_argument('--save_parquet', type=str, nargs='?', const='',
+                       help='Save results to a zstd-compressed Parquet file (requires pandas and pyarrow). Optionally specify filename, otherwise timestamp will be used.')
 
     args = parser.parse_args()
 
-    xml_response = query_arxiv(args.search_query, args.start, args.max_results, args.sort_by, args.sort_order)
-    results = parse_arxiv_response(xml_response)
-    display_results(results)
-    
+    if args.max_results > args.page_size:
+        results = asyncio.run(query_arxiv_pages(args.search_query, args.max_results, args.page_size, args.start, args.sort_by, args.sort_order, use_cache=not args.no_cache))
+    else:
+        url = build_query_url(args.search_query, args.start, args.max_results, args.sort_by, args.sort_order)
+        results = iter_arxiv_entries(url, use_cache=not args.no_cache)
     if args.save_csv is not None:
-        save_to_csv(results, args.save_csv)
+        results = write_csv_rows(results, args.save_csv)
+    if args.save_parquet is not None:
+        results = write_parquet_rows(results, args.save_parquet)
+    display_results(results)
 
 if __name__ == '__main__':
     main()
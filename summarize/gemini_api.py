@@ -1,94 +1,243 @@
 import os
 import time
+import asyncio
+import random
+import hashlib
 import logging
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
 import google.generativeai as genai
 import google.api_core.exceptions
-from typing import Optional
+from typing import Callable, Optional
 from dotenv import load_dotenv
 
 class GeminiAPI:
-    def __init__(self):
+    def __init__(self, system_instruction: Optional[str] = None, temperature: Optional[float] = None,
+                 cache_size: int = 1024):
         # Load environment variables from .env file
         load_dotenv()
 
         api_key = os.environ.get("AISTUDIO_GOOGLE_API_KEY")
         if not api_key:
             raise ValueError("AISTUDIO_GOOGLE_API_KEY environment variable is not set")
-        
+
         genai.configure(api_key=api_key)
-        self.model: genai.GenerativeModel = genai.GenerativeModel("gemini-1.5-flash")
-        self.MAX_RETRIES: int = 3
-        self.RETRY_DELAY: int = 120  # 2 minutes base delay
-        self.WAIT_BETWEEN_CALLS: int = 120  # 2 minutes between API calls
-        self._last_call_time = 0
+        self.MODEL_NAME: str = "gemini-1.5-flash"
+        # None keeps the model's default sampling temperature
+        self.TEMPERATURE: Optional[float] = temperature
+        # Build the model once so every call reuses its client and open connection.
+        # Static instructions go in the system instruction so prompts only carry per-paper text;
+        # the prefix is far below the 32k token minimum for Gemini context caching, so it isn't cached server side
+        self.model: genai.GenerativeModel = genai.GenerativeModel(
+            self.MODEL_NAME, system_instruction=system_instruction,
+            generation_config=None if temperature is None else {'temperature': temperature}
+        )
+        self.MAX_RETRIES: int = 6
+        # Full-jitter exponential backoff, used when the server gives no hint
+        self.RETRY_BASE_DELAY: float = 1.0
+        self.RETRY_MAX_DELAY: float = 30.0
+        # The last retry waits out at least one per-minute quota window, counted from the first attempt
+        self.RETRY_WINDOW: float = 60.0
+
+        # When a rate limit error said we may retry, shared by every concurrent request
+        self._retry_at: float = 0
+
+        # Called on every rate limit, unavailability or timeout error, e.g. to shed concurrency
+        self.on_overload: Optional[Callable[[], None]] = None
+
+        # Recent summaries keyed by prompt hash, so repeated prompts aren't billed twice; 0 disables
+        self.CACHE_SIZE: int = cache_size
+        self._summaries: OrderedDict[str, str] = OrderedDict()
+
+    @staticmethod
+    def prompt_key(prompt: str) -> str:
+        """Idempotency key for a prompt; retries of the same prompt share it"""
+        return hashlib.blake2b(prompt.encode('utf-8'), digest_size=16).hexdigest()
+
+    def _cached_summary(self, key: str) -> Optional[str]:
+        if not self.CACHE_SIZE:
+            return None
+        summary = self._summaries.get(key)
+        if summary is not None:
+            self._summaries.move_to_end(key)
+        return summary
+
+    def _remember_summary(self, key: str, summary: str) -> None:
+        if not self.CACHE_SIZE:
+            return
+        self._summaries[key] = summary
+        self._summaries.move_to_end(key)
+        if len(self._summaries) > self.CACHE_SIZE:
+            self._summaries.popitem(last=False)
+
+    def _record_retry_after(self, headers) -> None:
+        """Remember a Retry-After header from an error response, when the transport exposes one"""
+        retry_after = headers.get('retry-after') if headers else None
+        if retry_after:
+            try:
+                self._retry_at = time.time() + float(retry_after)
+            except ValueError:
+                # Retry-After may also be an HTTP date
+                try:
+                    self._retry_at = parsedate_to_datetime(retry_after).timestamp()
+                except (TypeError, ValueError):
+                    pass
+
+    def _retry_after(self, e: Exception) -> Optional[float]:
+        """Seconds the server asked us to wait before retrying, if it said"""
+        # REST transport errors carry the HTTP response and its headers
+        response = getattr(e, 'response', None)
+        self._record_retry_after(getattr(response, 'headers', None))
+        if self._retry_at > time.time():
+            return self._retry_at - time.time()
+
+        # gRPC errors carry a google.rpc.RetryInfo detail instead
+        for detail in getattr(e, 'details', None) or []:
+            delay = getattr(detail, 'retry_delay', None)
+            if delay is not None:
+                wait_time = delay.seconds + delay.nanos / 1e9
+                self._retry_at = time.time() + wait_time
+                return wait_time
+
+        return None
+
+    def _pending_wait(self) -> float:
+        """Seconds to hold off before the next call; zero unless a rate limit error asked us to wait"""
+        return max(0.0, self._retry_at - time.time())
 
     def _wait_between_calls(self):
-        """Ensure we wait appropriate time between API calls"""
-        if self._last_call_time > 0:
-            elapsed = time.time() - self._last_call_time
-            if elapsed < self.WAIT_BETWEEN_CALLS:
-                wait_time = self.WAIT_BETWEEN_CALLS - elapsed
-                logging.info(f"Waiting {wait_time:.1f} seconds before next API call...")
-                time.sleep(wait_time)
-        self._last_call_time = time.time()
+        """Only wait between API calls when the server asked us to"""
+        wait_time = self._pending_wait()
+        if wait_time > 0:
+            logging.info(f"Waiting {wait_time:.1f} seconds before next API call...")
+            time.sleep(wait_time)
+
+    def _finish(self, key: str, result: tuple[Optional[str], Optional[str]]) -> tuple[Optional[str], Optional[str]]:
+        # Only successful summaries are remembered
+        summary, error = result
+        if summary is not None and not error:
+            self._remember_summary(key, summary)
+        return result
+
+    def _parse_response(self, response) -> tuple[Optional[str], Optional[str]]:
+        """Extract the summary text from a Gemini response"""
+        # Check if the response was blocked
+        if response.prompt_feedback.block_reason:
+            error_msg = f"Response blocked: {response.prompt_feedback.block_reason}"
+            logging.error(error_msg)
+            return None, error_msg
+
+        # Handle the response
+        if hasattr(response, 'text'):
+            summary = response.text.strip()
+        elif hasattr(response, 'parts'):
+            summary = ' '.join([part.text for part in response.parts]).strip()
+        else:
+            summary = str(response)
+
+        return summary, None
+
+    def _backoff_delay(self, attempt: int) -> float:
+        """Random delay up to the capped exponential bound, so concurrent retries don't collide"""
+        return random.uniform(0, min(self.RETRY_MAX_DELAY, self.RETRY_BASE_DELAY * 2 ** attempt))
+
+    def _handle_error(self, e: Exception, attempt: int, elapsed: float = 0.0) -> tuple[Optional[float], Optional[str]]:
+        """
+        Decide how to proceed after a failed API call, `elapsed` seconds after the first attempt started.
+        Returns (wait_time, None) to retry, or (None, error_msg) to give up.
+        """
+        if isinstance(e, google.api_core.exceptions.InvalidArgument):
+            error_msg = f"Invalid argument error: {str(e)}"
+            logging.error(error_msg)
+            return None, error_msg
+
+        if self.on_overload and isinstance(e, (google.api_core.exceptions.ResourceExhausted,
+                                               google.api_core.exceptions.ServiceUnavailable,
+                                               google.api_core.exceptions.DeadlineExceeded,
+                                               asyncio.TimeoutError)):
+            self.on_overload()
+
+        if isinstance(e, google.api_core.exceptions.ResourceExhausted):
+            logging.warning(f"Rate limit exceeded (attempt {attempt + 1}/{self.MAX_RETRIES}): {str(e)}")
+            error_msg = "Rate limit exceeded"
+        else:
+            logging.error(f"Unexpected error (attempt {attempt + 1}/{self.MAX_RETRIES}): {str(e)}")
+            error_msg = str(e)
+
+        if attempt < self.MAX_RETRIES - 1:
+            # Honor the server's Retry-After when given, otherwise back off
+            wait_time = self._retry_after(e)
+            if wait_time is None:
+                wait_time = self._backoff_delay(attempt)
+                # Jittered backoff alone may total well under a minute, which a rate limit can outlast
+                if attempt == self.MAX_RETRIES - 2:
+                    wait_time = max(wait_time, self.RETRY_WINDOW - elapsed)
+            logging.info(f"Waiting {wait_time:.1f} seconds before retry...")
+            return wait_time, None
+
+        logging.error(f"Max retries exceeded: {error_msg}")
+        return None, error_msg
 
     def generate_summary(self, prompt: str) -> tuple[Optional[str], Optional[str]]:
         """
         Generate a summary using Gemini API.
-        Handles rate limiting by waiting between calls.
+        Handles rate limiting by waiting only when a rate limit error asked us to.
         """
-        self._wait_between_calls()
-        
         if not prompt or not isinstance(prompt, str):
             return None, "Invalid prompt: prompt must be a non-empty string"
-        
+
+        key = self.prompt_key(prompt)
+        cached = self._cached_summary(key)
+        if cached is not None:
+            return cached, None
+
+        self._wait_between_calls()
+
+        started = time.monotonic()
         for attempt in range(self.MAX_RETRIES):
             try:
                 response = self.model.generate_content(prompt)
-                
-                # Check if the response was blocked
-                if response.prompt_feedback.block_reason:
-                    error_msg = f"Response blocked: {response.prompt_feedback.block_reason}"
-                    logging.error(error_msg)
-                    return None, error_msg
+                return self._finish(key, self._parse_response(response))
 
-                # Handle the response
-                if hasattr(response, 'text'):
-                    summary = response.text.strip()
-                elif hasattr(response, 'parts'):
-                    summary = ' '.join([part.text for part in response.parts]).strip()
-                else:
-                    summary = str(response)
-                
-                return summary, None
-
-            except google.api_core.exceptions.ResourceExhausted as e:
-                logging.warning(f"Rate limit exceeded (attempt {attempt + 1}/{self.MAX_RETRIES}): {str(e)}")
-                if attempt < self.MAX_RETRIES - 1:
-                    wait_time = self.RETRY_DELAY * (attempt + 1)  # Exponential backoff
-                    logging.info(f"Waiting {wait_time} seconds before retry...")
-                    time.sleep(wait_time)
-                else:
-                    error_msg = "Rate limit exceeded"
-                    logging.error(f"Max retries exceeded: {error_msg}")
+            except Exception as e:
+                wait_time, error_msg = self._handle_error(e, attempt, time.monotonic() - started)
+                if error_msg:
                     return None, error_msg
-                    
-            except google.api_core.exceptions.InvalidArgument as e:
-                error_msg = f"Invalid argument error: {str(e)}"
-                logging.error(error_msg)
-                return None, error_msg
-                
+                time.sleep(wait_time)
+
+        return None, "Max retries exceeded"
+
+    async def generate_summary_async(self, prompt: str) -> tuple[Optional[str], Optional[str]]:
+        """
+        Generate a summary using the async Gemini client.
+        Pacing between calls is left to the caller so many requests can be in flight.
+        """
+        if not prompt or not isinstance(prompt, str):
+            return None, "Invalid prompt: prompt must be a non-empty string"
+
+        key = self.prompt_key(prompt)
+        cached = self._cached_summary(key)
+        if cached is not None:
+            return cached, None
+
+        # A rate limit hit by any concurrent request pauses the others too
+        wait_time = self._pending_wait()
+        if wait_time > 0:
+            logging.info(f"Waiting {wait_time:.1f} seconds before next API call...")
+            await asyncio.sleep(wait_time)
+
+        started = time.monotonic()
+        for attempt in range(self.MAX_RETRIES):
+            try:
+                response = await self.model.generate_content_async(prompt)
+                return self._finish(key, self._parse_response(response))
+
             except Exception as e:
-                logging.error(f"Unexpected error (attempt {attempt + 1}/{self.MAX_RETRIES}): {str(e)}")
-                if attempt < self.MAX_RETRIES - 1:
-                    wait_time = self.RETRY_DELAY * (attempt + 1)
-                    logging.info(f"Waiting {wait_time} seconds before retry...")
-                    time.sleep(wait_time)
-                else:
-                    error_msg = str(e)
-                    logging.error(f"Max retries exceeded: {error_msg}")
+                wait_time, error_msg = self._handle_error(e, attempt, time.monotonic() - started)
+                if error_msg:
                     return None, error_msg
-        
+                await asyncio.sleep(wait_time)
+
         return None, "Max retries exceeded"
 
     def check_api_availability(self) -> bool:
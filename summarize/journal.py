@@ -0,0 +1,93 @@
+import os
+import sqlite3
+from typing import Iterable, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS papers (
+    link TEXT PRIMARY KEY,
+    title TEXT,
+    authors TEXT,
+    summary TEXT,
+    ai_abstract TEXT,
+    ai_summary TEXT
+);
+-- Only unsummarized papers are indexed, so finding the remaining work stays cheap as the table fills
+CREATE INDEX IF NOT EXISTS papers_pending ON papers(link) WHERE ai_abstract IS NULL;
+"""
+
+COLUMNS = ('link', 'title', 'authors', 'summary', 'ai_abstract', 'ai_summary')
+
+# Stored in the SQLite header (PRAGMA application_id) to tell our journals apart from any other database
+APPLICATION_ID = 0x61727876  # 'arxv'
+
+class PaperJournal:
+    """
+    SQLite journal of summarizer progress, kept next to the papers CSV.
+    Each result is a single-row UPDATE instead of a rewrite of the whole CSV.
+    """
+    def __init__(self, path: str, checkpoint_every: int = 50):
+        existed = os.path.exists(path)
+        self.path: str = path
+        self.conn: sqlite3.Connection = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        # Never adopt (and later delete) a database that some other tool left at this path
+        if existed and self.conn.execute("PRAGMA application_id").fetchone()[0] != APPLICATION_ID:
+            self.conn.close()
+            raise ValueError(f"{path} exists but is not a summarizer journal, move it out of the way first")
+        self.conn.execute(f"PRAGMA application_id = {APPLICATION_ID}")
+        # Commits append to the write-ahead log without an fsync, so they survive the process
+        # being killed; the log is only synced to disk on the periodic checkpoints below
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.checkpoint_every: int = checkpoint_every
+        self._unsynced: int = 0
+
+    def load(self, rows: Iterable[tuple]) -> None:
+        """Add papers, given as tuples in COLUMNS order; results already journaled win over the CSV"""
+        self.conn.executemany(
+            f"""INSERT INTO papers ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})
+                ON CONFLICT(link) DO UPDATE SET
+                    ai_abstract = COALESCE(papers.ai_abstract, excluded.ai_abstract),
+                    ai_summary = COALESCE(papers.ai_summary, excluded.ai_summary)""",
+            rows
+        )
+        self.conn.commit()
+
+    def pending_count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM papers WHERE ai_abstract IS NULL").fetchone()[0]
+
+    def pending(self, after: str = '', limit: int = -1) -> list[sqlite3.Row]:
+        """
+        Papers that still need an ai_abstract, in link order starting after `after`.
+        Paging by link rather than offset stays correct while earlier pages are being filled in.
+        """
+        return self.conn.execute(
+            "SELECT link, title, authors, summary FROM papers WHERE ai_abstract IS NULL AND link > ? ORDER BY link LIMIT ?",
+            (after, limit)
+        ).fetchall()
+
+    def record(self, link: str, ai_abstract: str) -> None:
+        self.conn.execute("UPDATE papers SET ai_abstract = ? WHERE link = ?", (ai_abstract, link))
+        self.conn.commit()
+        self._unsynced += 1
+        if self._unsynced >= self.checkpoint_every:
+            self.conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+            self._unsynced = 0
+
+    def result(self, link: str, column: str = 'ai_abstract') -> Optional[str]:
+        """Recorded value for one paper, if any"""
+        if column not in COLUMNS:
+            raise ValueError(f"Unknown journal column: {column}")
+        row = self.conn.execute(f"SELECT {column} FROM papers WHERE link = ?", (link,)).fetchone()
+        return row[0] if row else None
+
+    def close(self, remove: bool = False) -> None:
+        """Close the journal, deleting its file once its results have been merged elsewhere"""
+        self.conn.close()
+        if remove:
+            os.remove(self.path)
+
+def journal_path(csv_file: str) -> str:
+    # The full file name is kept, so papers.csv and papers.parquet get separate journals
+    return csv_file + '.journal.sqlite'
@@ -0,0 +1,47 @@
+import os
+import time
+import sqlite3
+import hashlib
+from typing import Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    response TEXT NOT NULL,
+    ts INTEGER NOT NULL
+);
+"""
+
+def cache_key(model_name: str, prompt: str, system_instruction: str = '') -> str:
+    """SHA-256 of the model, instructions and prompt, so changing any of them never returns a stale answer"""
+    return hashlib.sha256(f"{model_name}\n{system_instruction}\n{prompt}".encode('utf-8')).hexdigest()
+
+class LLMCache:
+    """
+    Persistent prompt -> response cache backed by SQLite.
+    Only meant for deterministic (temperature 0) calls, where a cached answer is as good as a fresh one.
+    """
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path: str = path
+        self.conn: sqlite3.Connection = sqlite3.connect(path)
+        # WAL lets several summarizer runs read the cache while one writes
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def get(self, key: str) -> Optional[str]:
+        row = self.conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: str) -> None:
+        self.conn.execute(
+            "INSERT OR REPLACE INTO responses (key, response, ts) VALUES (?, ?, ?)",
+            (key, value, int(time.time()))
+        )
+        self.conn.commit()
+
+    def close(self) -> None:
+        self.conn.close()
@@ -0,0 +1,94 @@
+import os
+import csv
+from typing import Iterable, Iterator
+from journal import PaperJournal, journal_path, COLUMNS as JOURNAL_COLUMNS
+
+# Columns the summarizer fills in
+SUMMARY_COLUMNS = ['ai_abstract', 'ai_summary']
+
+# Rows per record batch when streaming Parquet files
+PARQUET_BATCH_ROWS = 10_000
+
+def is_parquet(path: str) -> bool:
+    return path.endswith('.parquet')
+
+def read_papers(csv_file: str) -> Iterator[dict]:
+    """Stream the papers CSV (or Parquet file) one row at a time"""
+    if is_parquet(csv_file):
+        import pyarrow.parquet as pq
+        # One record batch in memory at a time
+        for batch in pq.ParquetFile(csv_file).iter_batches(batch_size=PARQUET_BATCH_ROWS):
+            yield from batch.to_pylist()
+        return
+
+    with open(csv_file, newline='', encoding='utf-8') as f:
+        yield from csv.DictReader(f)
+
+def write_parquet_papers(parquet_file: str, fieldnames: list[str], rows: Iterable[dict]):
+    """Write rows to a zstd-compressed Parquet file in record batches, keeping the source file's column types"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    existing = pq.read_schema(parquet_file)
+    # Summary columns are always strings, even if every value was empty when the file was written
+    schema = pa.schema([
+        pa.field(name, pa.string()) if name in SUMMARY_COLUMNS or name not in existing.names else existing.field(name)
+        for name in fieldnames
+    ])
+
+    with pq.ParquetWriter(parquet_file + '.tmp', schema, compression='zstd') as writer:
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == PARQUET_BATCH_ROWS:
+                writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+                batch = []
+        if batch:
+            writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+
+def write_papers(csv_file: str, fieldnames: list[str], rows: Iterable[dict]):
+    """Write rows to a temporary file and swap it in, so a failed write never truncates the CSV"""
+    tmp_file = csv_file + '.tmp'
+    if is_parquet(csv_file):
+        write_parquet_papers(csv_file, fieldnames, rows)
+    else:
+        with open(tmp_file, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer.writeheader()
+            writer.writerows(rows)
+    os.replace(tmp_file, csv_file)
+
+def prepare_csv(csv_file: str) -> list[str]:
+    """Columns to write the CSV back with, adding any missing summary columns"""
+    if is_parquet(csv_file):
+        import pyarrow.parquet as pq
+        fieldnames = pq.read_schema(csv_file).names
+    else:
+        with open(csv_file, newline='', encoding='utf-8') as f:
+            fieldnames = csv.DictReader(f).fieldnames or []
+
+    # Only the header is read: new columns start out empty and merge_journal writes them with the results
+    return fieldnames + [column for column in SUMMARY_COLUMNS if column not in fieldnames]
+
+def load_journal(csv_file: str) -> PaperJournal:
+    """Open the progress journal for a CSV, seeding it with the CSV's unsummarized papers"""
+    journal = PaperJournal(journal_path(csv_file))
+    # Papers already summarized in the CSV never enter the journal, so it only ever holds the remaining work;
+    # empty cells come back as '' from the csv module, which the journal stores as NULL for "not done yet"
+    journal.load(
+        tuple(row.get(column) or None for column in JOURNAL_COLUMNS)
+        for row in read_papers(csv_file) if not row.get('ai_abstract')
+    )
+    return journal
+
+def merge_journal(csv_file: str, fieldnames: list[str], journal: PaperJournal):
+    """Stream the CSV back out with journaled results filled in"""
+    def merged():
+        for row in read_papers(csv_file):
+            # Looked up row by row so results never have to fit in memory at once
+            result = journal.result(row['link'])
+            if result is not None:
+                row['ai_abstract'] = result
+            yield row
+
+    write_papers(csv_file, fieldnames, merged())
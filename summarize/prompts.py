@@ -0,0 +1,70 @@
+import re
+import json
+from typing import Optional
+
+# Instructions shared by every request, sent once per call as the model's system instruction
+SYSTEM_PROMPT = """Summarize scientific papers in a couple of sentences each, focusing on:
+1. The main research question or objective
+2. Key findings and conclusions
+3. Potential implications or applications
+
+If you cannot generate a summary, return only 'Unable to summarize'.
+Only return the summary, or the JSON array when asked for one, nothing else.
+"""
+
+# Per-paper message; str.format fills it in one C-level pass, unlike Template's regex substitution
+PROMPT = """Title: {title}
+Authors: {authors}
+Original Abstract: {summary}
+"""
+
+# Several papers in one request, answered as a JSON array in the same order
+BATCH_PROMPT = """{papers}
+Return a JSON array of exactly {count} strings, one summary per paper, in the order given.
+If you cannot summarize a paper, use 'Unable to summarize' as its entry.
+Only return the JSON array, nothing else.
+"""
+BATCH_ENTRY = """[Paper {number}]
+Title: {title}
+Authors: {authors}
+Original Abstract: {summary}
+"""
+
+# Abstracts longer than this are cut before prompting; past it they add tokens, not summary quality
+MAX_ABSTRACT_CHARS = 4000
+TRUNCATED_MARKER = '\n\n[abstract truncated]'
+# Anything shorter has nothing worth a request
+MIN_ABSTRACT_CHARS = 50
+
+# Gemini 1.5 Flash returns at most 8192 output tokens, a summary takes up to about 200
+MAX_BATCH_SIZE = 8192 // 200
+
+JSON_FENCE = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL)
+
+def cap_abstract(abstract: Optional[str]) -> tuple[str, bool]:
+    """The abstract cut to MAX_ABSTRACT_CHARS, and whether it had to be cut"""
+    abstract = (abstract or '').strip()
+    if len(abstract) <= MAX_ABSTRACT_CHARS:
+        return abstract, False
+    return abstract[:MAX_ABSTRACT_CHARS] + TRUNCATED_MARKER, True
+
+def paper_prompt(paper) -> str:
+    return PROMPT.format(title=paper['title'], authors=paper['authors'], summary=paper['summary'])
+
+def batch_prompt(papers: list) -> str:
+    entries = '\n'.join(
+        BATCH_ENTRY.format(number=number, title=paper['title'], authors=paper['authors'], summary=paper['summary'])
+        for number, paper in enumerate(papers, 1)
+    )
+    return BATCH_PROMPT.format(count=len(papers), papers=entries)
+
+def parse_batch(response: str, count: int) -> Optional[list[str]]:
+    """Summaries from a batch response, or None unless it is a JSON array of exactly `count` strings"""
+    match = JSON_FENCE.search(response)
+    try:
+        summaries = json.loads(match.group(1) if match else response)
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(summaries, list) or len(summaries) != count or not all(isinstance(s, str) for s in summaries):
+        return None
+    return [summary.strip() for summary in summaries]
@@ -0,0 +1,157 @@
+import time
+import asyncio
+import logging
+from typing import Awaitable, Callable, Optional
+
+# aiolimiter's leaky bucket is preferred when installed
+try:
+    from aiolimiter import AsyncLimiter
+except ImportError:
+    AsyncLimiter = None
+
+class TokenBucket:
+    """
+    Asyncio token bucket allowing `rate` units per `period` seconds, used as `async with bucket:`
+    or `await bucket.acquire(amount)` for weighted costs such as prompt tokens.
+    The bucket starts full, so bursts up to `rate` go through immediately and the rest are spread evenly.
+    """
+    def __init__(self, rate: int, period: float = 60.0):
+        if rate < 1:
+            raise ValueError("rate must be at least 1")
+
+        self.rate: int = rate
+        self.period: float = period
+        self._tokens: float = float(rate)
+        self._updated: float = time.monotonic()
+        # Waiters are served in order, so a large request isn't starved by a stream of small ones
+        self._lock: asyncio.Lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.rate, self._tokens + (now - self._updated) * self.rate / self.period)
+        self._updated = now
+
+    async def acquire(self, amount: float = 1) -> None:
+        """Wait until `amount` units are available and take them"""
+        # Anything larger than the bucket could never fit, so it just waits for a full bucket
+        amount = min(amount, self.rate)
+        async with self._lock:
+            self._refill()
+            while self._tokens < amount:
+                await asyncio.sleep((amount - self._tokens) * self.period / self.rate)
+                self._refill()
+            self._tokens -= amount
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+def request_limiter(rate: int, period: float = 60.0):
+    """Limiter allowing `rate` units per `period` seconds: aiolimiter's if installed, else TokenBucket"""
+    if AsyncLimiter is not None:
+        return AsyncLimiter(rate, period)
+    return TokenBucket(rate, period)
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token), close enough for pacing without a count_tokens call"""
+    return len(text) // 4 + 1
+
+class AIMDController:
+    """
+    Adaptive concurrency limit for async requests, used as `async with controller:`.
+    The limit grows additively while smoothed latency stays under target and is cut
+    multiplicatively whenever the server signals overload (rate limits, unavailability, timeouts).
+    """
+    def __init__(self, initial: int = 1, minimum: int = 1, maximum: int = 16, target_latency: float = 10.0,
+                 increase: float = 0.5, decrease: float = 0.5, smoothing: float = 0.2):
+        if not 1 <= minimum <= maximum:
+            raise ValueError("Concurrency bounds must satisfy 1 <= minimum <= maximum")
+
+        self.minimum: int = minimum
+        self.maximum: int = maximum
+        self.limit: float = float(min(max(initial, minimum), maximum))
+        self.target_latency: float = target_latency
+        self.increase: float = increase
+        self.decrease: float = decrease
+        self.smoothing: float = smoothing
+        self.ema_latency: Optional[float] = None
+        self._in_flight: int = 0
+        self._changed: asyncio.Condition = asyncio.Condition()
+
+    async def __aenter__(self):
+        async with self._changed:
+            await self._changed.wait_for(lambda: self._in_flight < int(self.limit))
+            self._in_flight += 1
+        return self
+
+    async def __aexit__(self, *exc_info):
+        # Only as many waiters as there are free slots are woken, which also picks up any change to the limit
+        # since they queued; waking all of them made every release O(waiters) with thousands queued
+        async with self._changed:
+            self._in_flight -= 1
+            self._changed.notify(int(self.limit) - self._in_flight)
+
+    def record_success(self, latency: float) -> None:
+        """Additive increase while the smoothed latency is within target"""
+        if self.ema_latency is None:
+            self.ema_latency = latency
+        else:
+            self.ema_latency += self.smoothing * (latency - self.ema_latency)
+
+        if self.ema_latency <= self.target_latency:
+            self.limit = min(self.maximum, self.limit + self.increase)
+
+    def record_overload(self) -> None:
+        """Multiplicative decrease on an overload signal"""
+        self.limit = max(self.minimum, self.limit * self.decrease)
+
+class CircuitBreaker:
+    """
+    Stops sending requests to a failing API, used as `if await breaker.allow(probe):` before each call.
+    After `fail_max` consecutive failures the circuit opens: one caller probes the API every `reset_timeout`
+    seconds while the rest wait, and the circuit closes on the first successful probe.
+    If `max_probes` probes in a row fail, allow() returns False for everyone from then on.
+    """
+    def __init__(self, fail_max: int = 5, reset_timeout: float = 30.0, max_probes: int = 3):
+        self.fail_max: int = fail_max
+        self.reset_timeout: float = reset_timeout
+        self.max_probes: int = max_probes
+        self.failures: int = 0
+        self.given_up: bool = False
+        self._closed: asyncio.Event = asyncio.Event()
+        self._closed.set()
+        self._probing: bool = False
+
+    def record_success(self) -> None:
+        self.failures = 0
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.failures >= self.fail_max:
+            self._closed.clear()
+
+    async def allow(self, probe: Callable[[], Awaitable[bool]]) -> bool:
+        """Wait while the circuit is open; False once the API stayed down through every probe"""
+        if not self._closed.is_set() and not self._probing:
+            self._probing = True
+            logging.warning(f"{self.failures} consecutive errors, pausing requests to check the API")
+            try:
+                for attempt in range(self.max_probes):
+                    await asyncio.sleep(self.reset_timeout)
+                    if await probe():
+                        logging.info("API is responding again, resuming requests")
+                        self.failures = 0
+                        break
+                    logging.warning(f"API still unavailable (probe {attempt + 1}/{self.max_probes})")
+                else:
+                    self.given_up = True
+            finally:
+                self._probing = False
+                # Wakes every waiter; they see given_up if the API never came back
+                self._closed.set()
+
+        await self._closed.wait()
+        return not self.given_up
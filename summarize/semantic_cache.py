@@ -0,0 +1,128 @@
+import os
+import sqlite3
+from typing import Optional, Sequence
+
+# Embedding and vector search are optional; without them only exact prompt matches are cached
+try:
+    import faiss
+    import numpy as np
+    from sentence_transformers import SentenceTransformer
+except ImportError:
+    faiss = None
+    SentenceTransformer = None
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,  -- Also the vector's id in the FAISS index
+    link TEXT,
+    response TEXT NOT NULL,
+    vector BLOB NOT NULL                   -- float32 embedding, so the index can always be rebuilt from here
+);
+"""
+
+DEFAULT_MODEL = 'all-MiniLM-L6-v2'
+DEFAULT_THRESHOLD = 0.92
+# Missing vectors are read back from SQLite this many at a time
+RELOAD_BATCH = 500
+
+def semantic_cache_available() -> bool:
+    return faiss is not None and SentenceTransformer is not None
+
+class SemanticCache:
+    """
+    Reuses the summary of a previously seen abstract when a new one is nearly identical,
+    e.g. a v2 of the same paper or a workshop and conference version.
+    Abstracts are embedded with a small local encoder and compared by cosine similarity.
+    Entries and their vectors live in `<path>.sqlite`; the FAISS index saved to `<path>.faiss`
+    is only a copy of those vectors, keyed by entry id. It is topped up from SQLite on open when it is
+    behind, whether after an unclean exit or because another run sharing the cache saved its index last.
+    """
+    def __init__(self, path: str, threshold: float = DEFAULT_THRESHOLD, model_name: str = DEFAULT_MODEL,
+                 save_every: int = 100):
+        if not semantic_cache_available():
+            raise ImportError("The semantic cache needs sentence-transformers and faiss-cpu installed")
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.threshold: float = threshold
+        self.index_path: str = path + '.faiss'
+        self.save_every: int = save_every
+        self.encoder = SentenceTransformer(model_name)
+        self.conn: sqlite3.Connection = sqlite3.connect(path + '.sqlite')
+        # Several summarizer runs may share the cache; SQLite hands out entry ids, so their writes never collide
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+        self.dimension: int = self.encoder.get_sentence_embedding_dimension()
+        self.index = faiss.read_index(self.index_path) if os.path.exists(self.index_path) else None
+        stored = {row[0] for row in self.conn.execute("SELECT id FROM entries")}
+        indexed = self._indexed_ids()
+        if indexed is None or not indexed <= stored:
+            # No usable index, or one holding entries SQLite doesn't have, so it is rebuilt from SQLite
+            self.index = self._new_index()
+            indexed = set()
+        # Vectors committed after the index was last saved are re-added, nothing already cached is dropped
+        missing = sorted(stored - indexed)
+        for start in range(0, len(missing), RELOAD_BATCH):
+            batch = missing[start:start + RELOAD_BATCH]
+            self._add_vectors(self.conn.execute(
+                f"SELECT id, vector FROM entries WHERE id IN ({', '.join('?' * len(batch))})", batch
+            ).fetchall())
+        # Anything re-added is saved again on close
+        self._unsaved: int = len(missing)
+
+    def _new_index(self):
+        # Inner product of normalized vectors is cosine similarity; the ID map keys vectors by entry id
+        return faiss.IndexIDMap(faiss.IndexFlatIP(self.dimension))
+
+    def _indexed_ids(self) -> Optional[set]:
+        """Entry ids in the loaded index, or None if it can't be used"""
+        if self.index is None or not isinstance(self.index, faiss.IndexIDMap) or self.index.d != self.dimension:
+            return None
+        return set(faiss.vector_to_array(self.index.id_map).tolist())
+
+    def _add_vectors(self, rows) -> None:
+        if rows:
+            ids = np.array([row[0] for row in rows], dtype='int64')
+            self.index.add_with_ids(np.vstack([np.frombuffer(row[1], dtype='float32') for row in rows]), ids)
+
+    def encode(self, texts: Sequence[str]):
+        """Embed many abstracts in one batched pass, returning normalized float32 vectors"""
+        return self.encoder.encode(list(texts), batch_size=64, normalize_embeddings=True,
+                                   convert_to_numpy=True, show_progress_bar=False).astype('float32')
+
+    def lookup(self, vector) -> Optional[str]:
+        """Summary of the closest cached abstract, if it is similar enough"""
+        if self.index.ntotal == 0:
+            return None
+        scores, ids = self.index.search(np.asarray(vector, dtype='float32').reshape(1, -1), 1)
+        if ids[0][0] < 0 or scores[0][0] < self.threshold:
+            return None
+        row = self.conn.execute("SELECT response FROM entries WHERE id = ?", (int(ids[0][0]),)).fetchone()
+        return row[0] if row else None
+
+    def add(self, vector, link: str, response: str) -> None:
+        vector = np.asarray(vector, dtype='float32')
+        cursor = self.conn.execute("INSERT INTO entries (link, response, vector) VALUES (?, ?, ?)",
+                                   (link, response, vector.tobytes()))
+        self.conn.commit()
+        self.index.add_with_ids(vector.reshape(1, -1), np.array([cursor.lastrowid], dtype='int64'))
+        self._unsaved += 1
+        if self._unsaved >= self.save_every:
+            self.save()
+
+    def save(self) -> None:
+        """Write the index to disk, swapping it in so a crash mid-write leaves the previous copy"""
+        # Per process, so runs sharing the cache never write the same temporary file
+        tmp_path = f'{self.index_path}.{os.getpid()}.tmp'
+        faiss.write_index(self.index, tmp_path)
+        os.replace(tmp_path, self.index_path)
+        self._unsaved = 0
+
+    def close(self) -> None:
+        """Persist the index for the next run"""
+        if self._unsaved:
+            self.save()
+        self.conn.close()
@@ -1,15 +1,33 @@
 import sys
 import logging
 import os
-import pandas as pd
+import signal
+import asyncio
 from datetime import datetime
+from zoneinfo import ZoneInfo
 import time
-import pytz
 import argparse
+from typing import Optional
 from gemini_api import GeminiAPI
+from journal import journal_path
+from llm_cache import LLMCache
+from semantic_cache import SemanticCache, semantic_cache_available, DEFAULT_THRESHOLD
+from papers_io import prepare_csv, load_journal, merge_journal
+from prompts import SYSTEM_PROMPT, MAX_BATCH_SIZE
+from summarizer import Summarizer
+
+# Gemini 1.5 Flash free tier quota
+DEFAULT_RPM = 15
+DEFAULT_TPM = 1_000_000
+# Ceiling for the adaptive number of requests in flight
+DEFAULT_MAX_CONCURRENCY = 16
+# Responses to previously seen prompts, shared across runs and CSV files
+DEFAULT_LLM_CACHE = 'cache/llm_cache.sqlite'
+# Embeddings of summarized abstracts, for reusing summaries of near-duplicates
+DEFAULT_SEMANTIC_CACHE = 'cache/semantic_cache'
 
 # Set up logging with PST timezone
-pst = pytz.timezone('America/Los_Angeles')
+PST = ZoneInfo('America/Los_Angeles')
 
 def setup_logging():
     """Configure logging with PST timezone"""
@@ -22,98 +40,140 @@ def setup_logging():
         format='%(asctime)s %(levelname)s: %(message)s',
         datefmt='%Y-%m-%d %H:%M:%S',
         handlers=[
-            logging.FileHandler(f'logs/summarize_{datetime.now(pst).strftime("%Y%m%d_%H%M%S")}.log'),
+            logging.FileHandler(f'logs/summarize_{datetime.now(PST).strftime("%Y%m%d_%H%M%S")}.log'),
             logging.StreamHandler()
         ]
     )
-    # Add PST timezone formatter to logger
-    logging.Formatter.converter = lambda *args: datetime.now(pst).timetuple()
+    # Log timestamps in PST: switching the process timezone keeps the default C-level time.localtime converter
+    if hasattr(time, 'tzset'):
+        os.environ['TZ'] = PST.key
+        time.tzset()
+    else:  # No tzset on Windows
+        logging.Formatter.converter = lambda *args: datetime.now(PST).timetuple()
     return logging.getLogger(__name__)
 
-def prepare_csv(csv_file: str) -> pd.DataFrame:
-    """Prepare CSV file by ensuring required columns exist"""
-    df = pd.read_csv(csv_file)
-    modified = False
-    
-    for column in ['ai_abstract', 'ai_summary']:
-        if column not in df.columns:
-            df[column] = pd.Series(dtype='string')
-            modified = True
-    
-    if modified:
-        df.to_csv(csv_file, index=False)
-    
-    return df
-
-def summarize_papers(csv_file: str, logger: logging.Logger):
-    """Summarize papers using Gemini API"""
+async def summarize_papers(csv_file: str, logger: logging.Logger, rpm: int = DEFAULT_RPM, tpm: Optional[int] = DEFAULT_TPM, concurrency: Optional[int] = None,
+                           max_concurrency: int = DEFAULT_MAX_CONCURRENCY, llm_cache: Optional[str] = DEFAULT_LLM_CACHE,
+                           semantic_cache: Optional[str] = None, semantic_threshold: float = DEFAULT_THRESHOLD,
+                           batch_size: int = 1, temperature: Optional[float] = None):
+    """Summarize papers using Gemini API, running requests concurrently within the rate limit"""
     try:
-        # Initialize Gemini API
-        gemini = GeminiAPI()
+        # Initialize Gemini API; without a cache path, duplicate prompts in a run are sent again too
+        gemini = GeminiAPI(system_instruction=SYSTEM_PROMPT, temperature=temperature, cache_size=1024 if llm_cache else 0)
         
         # Check API availability before starting
         if not gemini.check_api_availability():
             logger.error("Gemini API is not available. Exiting...")
             return
         
-        df = prepare_csv(csv_file)
-        papers_to_summarize = df[df['ai_abstract'].isna()]
-        
-        if papers_to_summarize.empty:
+        # Results go to a SQLite journal as they arrive and are merged into the CSV once at the end
+        fieldnames = prepare_csv(csv_file)
+        resumed = os.path.exists(journal_path(csv_file))
+        journal = load_journal(csv_file)
+        if resumed:
+            logger.info(f"Resuming from journal {journal_path(csv_file)}")
+        total_papers = journal.pending_count()
+
+        if not total_papers:
+            # Still merge anything recovered from an interrupted run
+            if resumed:
+                merge_journal(csv_file, fieldnames, journal)
+            journal.close(remove=True)
             logger.info("All papers have been summarized!")
             return
 
-        total_papers = len(papers_to_summarize)
-        for counter, (_, paper) in enumerate(papers_to_summarize.iterrows()):
-            prompt = f"""Summarize this scientific paper in a couple of sentences, focusing on:
-             1. The main research question or objective
-             2. Key findings and conclusions
-             3. Potential implications or applications
-
-            Title: {paper['title']}
-            Authors: {paper['authors']}
-            Original Abstract: {paper['summary']}
-            
-            If you cannot generate a summary, return only 'Unable to summarize'. 
-            Only return the summary, nothing else.
-            """
-
-            summary, error = gemini.generate_summary(prompt)
-            
-            if error:
-                # Fatal errors will terminate the program
-                if error.startswith("FATAL:"):
-                    logger.error(f"Fatal error occurred: {error}")
-                    df.loc[df['link'] == paper['link'], 'ai_abstract'] = f"Error: {error}"
-                    df.to_csv(csv_file, index=False)
-                    sys.exit(1)
-                
-                # Non-fatal errors will be logged and the paper will be skipped
-                df.loc[df['link'] == paper['link'], 'ai_abstract'] = f"Error: {error}"
-                logger.error(f"Error processing paper {counter + 1}/{total_papers}: {error}")
-            else: # Successful summary
-                df.loc[df['link'] == paper['link'], 'ai_abstract'] = summary
-                logger.info(f"Summarized paper {counter + 1}/{total_papers}: {paper['title']}")
-                logger.info(f"Summary: {summary[:200]}...")
-            
-            # Save after each paper in case of interruption
-            df.to_csv(csv_file, index=False)
+        # Cached answers are only interchangeable with fresh ones when sampling is deterministic
+        cache = LLMCache(llm_cache) if llm_cache and gemini.TEMPERATURE == 0 else None
+        if llm_cache and not cache:
+            logger.info("Persistent response cache is only used with --temperature 0")
+
+        similar = None
+        if semantic_cache and not semantic_cache_available():
+            logger.warning("Semantic cache needs sentence-transformers and faiss-cpu, continuing without it")
+        elif semantic_cache:
+            similar = SemanticCache(semantic_cache, threshold=semantic_threshold)
+
+        summarizer = Summarizer(gemini, journal, logger, rpm=rpm, tpm=tpm, concurrency=concurrency,
+                                max_concurrency=max_concurrency, batch_size=batch_size, cache=cache, similar=similar)
+
+        # Ctrl-C already cancels the run; make SIGTERM do the same so the merge below still happens
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+        except NotImplementedError:
+            pass  # Not supported on Windows
+
+        try:
+            try:
+                await summarizer.run()
+            finally:
+                # Caches are saved before the merge, so a failed merge can't lose them
+                if cache:
+                    cache.close()
+                if similar:
+                    similar.close()
+        except asyncio.CancelledError:
+            logger.warning("Interrupted, saving progress...")
+            raise
+        finally:
+            # Merge once, even if interrupted; the journal survives only if this write fails
+            merge_journal(csv_file, fieldnames, journal)
+            journal.close(remove=True)
+
+        stats = summarizer.stats
+        if stats['truncated'] or stats['too_short']:
+            logger.info(f"Truncated {stats['truncated']} long abstracts, skipped {stats['too_short']} too short to summarize")
+        if stats['api_errors']:
+            logger.warning(f"{stats['api_errors']} papers failed on API errors and stay pending, run again to retry them")
+
+        if summarizer.fatal_error.is_set():
+            sys.exit(1)
 
     except Exception as e:
         logger.error(f"Fatal error: {str(e)}")
         sys.exit(1)
 
+def positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return number
+
 def main():
     parser = argparse.ArgumentParser(description='Summarize scientific papers using Gemini AI')
-    parser.add_argument('--csv_file', required=True, help='Path to the CSV file containing papers to summarize')
+    parser.add_argument('--csv_file', required=True, help='Path to the CSV (or .parquet, requires pyarrow) file containing papers to summarize')
+    parser.add_argument('--rpm', type=positive_int, default=DEFAULT_RPM, help=f'Gemini requests per minute allowed by your quota (default: {DEFAULT_RPM})')
+    parser.add_argument('--tpm', type=int, default=DEFAULT_TPM, help=f'Gemini input tokens per minute allowed by your quota, 0 to disable (default: {DEFAULT_TPM})')
+    parser.add_argument('--concurrency', type=positive_int, help='Initial requests in flight, adjusted to observed latency and rate limits (default: rpm / 60, at least 1)')
+    parser.add_argument('--max_concurrency', type=positive_int, default=DEFAULT_MAX_CONCURRENCY, help=f'Upper bound for requests in flight (default: {DEFAULT_MAX_CONCURRENCY})')
+    parser.add_argument('--temperature', type=float, help="Gemini sampling temperature (default: the model's own)")
+    parser.add_argument('--llm_cache', default=DEFAULT_LLM_CACHE, help=f'SQLite cache of Gemini responses keyed by prompt hash, used with --temperature 0 (default: {DEFAULT_LLM_CACHE})')
+    parser.add_argument('--no_llm_cache', action='store_true', help='Always call Gemini, ignoring cached responses')
+    parser.add_argument('--semantic_cache', action='store_true', help=f'Reuse summaries of near-duplicate abstracts, stored under {DEFAULT_SEMANTIC_CACHE} (needs sentence-transformers and faiss-cpu)')
+    parser.add_argument('--batch_size', type=positive_int, default=1, help=f'Papers summarized per Gemini request, up to {MAX_BATCH_SIZE} (default: 1)')
+    parser.add_argument('--semantic_threshold', type=float, default=DEFAULT_THRESHOLD, help=f'Cosine similarity above which an abstract counts as a near-duplicate (default: {DEFAULT_THRESHOLD})')
     args = parser.parse_args()
+    if args.tpm < 0:
+        parser.error(f"argument --tpm: must be at least 0, got {args.tpm}")
 
     if not os.path.exists(args.csv_file):
         print(f"Error: CSV file not found: {args.csv_file}")
         sys.exit(1)
 
     logger = setup_logging()
-    summarize_papers(args.csv_file, logger)
+    try:
+        asyncio.run(summarize_papers(args.csv_file, logger, rpm=args.rpm, tpm=args.tpm, concurrency=args.concurrency,
+                                     max_concurrency=args.max_concurrency,
+                                     llm_cache=None if args.no_llm_cache else args.llm_cache,
+                                     semantic_cache=DEFAULT_SEMANTIC_CACHE if args.semantic_cache else None,
+                                     semantic_threshold=args.semantic_threshold, batch_size=args.batch_size,
+                                     temperature=args.temperature))
+    # Progress was merged on the way out; exit like the signal would have, without a traceback
+    except KeyboardInterrupt:
+        logger.info("Progress saved")
+        sys.exit(128 + signal.SIGINT)
+    except asyncio.CancelledError:  # Only the SIGTERM handler cancels the run
+        logger.info("Progress saved")
+        sys.exit(128 + signal.SIGTERM)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,185 @@
+import time
+import asyncio
+import logging
+from typing import Optional
+from rate_limiter import AIMDController, CircuitBreaker, request_limiter, estimate_tokens
+from journal import PaperJournal
+from llm_cache import cache_key
+from prompts import SYSTEM_PROMPT, MIN_ABSTRACT_CHARS, MAX_BATCH_SIZE, cap_abstract, paper_prompt, batch_prompt, parse_batch
+
+# Errors caused by the paper itself rather than the API, which don't count towards tripping the circuit breaker
+PAPER_ERRORS = ('Response blocked', 'Invalid argument', 'Invalid prompt')
+
+# Pending papers read from the journal and scheduled at a time
+PENDING_CHUNK = 10_000
+
+class Summarizer:
+    """
+    Summarizes a journal's pending papers with Gemini, recording each result in the journal as it arrives.
+    Requests run concurrently under an adaptive concurrency limit, paced to the RPM and TPM quotas,
+    and pause behind a circuit breaker when the API keeps failing.
+    """
+    def __init__(self, gemini, journal: PaperJournal, logger: logging.Logger, rpm: int, tpm: Optional[int] = None,
+                 concurrency: Optional[int] = None, max_concurrency: int = 16, batch_size: int = 1,
+                 cache=None, similar=None):
+        self.gemini = gemini
+        self.journal: PaperJournal = journal
+        self.logger: logging.Logger = logger
+        self.cache = cache
+        self.similar = similar
+        self.batch_size: int = max(1, min(batch_size, MAX_BATCH_SIZE))
+        self.total_papers: int = journal.pending_count()
+
+        # Concurrency starts at the number of requests the quota allows per second, then adapts
+        initial = concurrency or max(1, rpm // 60)
+        self.controller: AIMDController = AIMDController(initial=initial, maximum=max(initial, max_concurrency))
+        gemini.on_overload = self.controller.record_overload
+        # Paced up front to both quotas, so bursts don't end in 429s and backoff
+        self.limiter = request_limiter(rpm, 60)
+        self.tpm: Optional[int] = tpm
+        self.token_limiter = request_limiter(tpm, 60) if tpm else None
+        # Pauses every request after repeated failures instead of spending quota on calls that will fail too
+        self.breaker: CircuitBreaker = CircuitBreaker()
+        self.fatal_error: asyncio.Event = asyncio.Event()
+        self.stats: dict[str, int] = {'truncated': 0, 'too_short': 0, 'api_errors': 0}
+
+    async def run(self) -> None:
+        # Pending papers are pulled from the journal a chunk at a time, so memory stays flat however big the CSV
+        offset, after = 0, ''
+        while not self.fatal_error.is_set():
+            papers = self.journal.pending(after, PENDING_CHUNK)
+            if not papers:
+                break
+            await self.summarize_chunk(offset, papers)
+            offset, after = offset + len(papers), papers[-1]['link']
+
+    async def summarize_chunk(self, offset: int, papers: list) -> None:
+        # One batched encoder pass for the chunk's abstracts
+        if self.similar:
+            vectors = self.similar.encode([paper['summary'] or '' for paper in papers])
+        else:
+            vectors = [None] * len(papers)
+        numbered = [(offset + i, paper, vector) for i, (paper, vector) in enumerate(zip(papers, vectors))]
+
+        # Each batch is one request, or one request per paper when batching is off
+        batches = [numbered[i:i + self.batch_size] for i in range(0, len(numbered), self.batch_size)]
+        results = await asyncio.gather(*(self.summarize_batch(batch) for batch in batches), return_exceptions=True)
+
+        for batch, result in zip(batches, results):
+            if isinstance(result, Exception):
+                self.logger.error(f"Error processing paper {batch[0][0] + 1}/{self.total_papers}: {str(result)}")
+
+    async def summarize_batch(self, batch: list[tuple]) -> None:
+        remaining = []
+        for counter, paper, vector in batch:
+            abstract, truncated = cap_abstract(paper['summary'])
+            if len(abstract) < MIN_ABSTRACT_CHARS:
+                self.stats['too_short'] += 1
+                self.journal.record(paper['link'], 'Unable to summarize')
+                self.logger.warning(f"Skipping paper {counter + 1}/{self.total_papers}, abstract too short: {paper['title']}")
+                continue
+            self.stats['truncated'] += truncated
+            # Later prompts, including batched ones, see the capped abstract
+            paper = dict(paper, summary=abstract)
+
+            prompt = paper_prompt(paper)
+            key = cache_key(self.gemini.MODEL_NAME, prompt, SYSTEM_PROMPT)
+            cached = self.cache.get(key) if self.cache else None
+            if cached is not None:
+                self.journal.record(paper['link'], cached)
+                self.logger.info(f"Summarized paper {counter + 1}/{self.total_papers} from cache: {paper['title']}")
+            else:
+                remaining.append((counter, paper, vector, prompt, key))
+        if not remaining:
+            return
+
+        async with self.controller:
+            # Don't start new requests once a fatal error has been seen
+            if self.fatal_error.is_set():
+                return
+
+            if self.similar:
+                # Looked up once a slot is free, so it also sees summaries finished earlier in this run
+                unmatched = []
+                for item in remaining:
+                    counter, paper, vector, _, _ = item
+                    reused = self.similar.lookup(vector)
+                    if reused is None:
+                        unmatched.append(item)
+                        continue
+                    self.journal.record(paper['link'], reused)
+                    self.logger.info(f"Summarized paper {counter + 1}/{self.total_papers} from a near-duplicate abstract: {paper['title']}")
+                remaining = unmatched
+
+            if len(remaining) > 1:
+                if not await self.api_available():
+                    return
+                response, error = await self.call_gemini(batch_prompt([paper for _, paper, _, _, _ in remaining]))
+                if error and error.startswith("FATAL:"):
+                    # The batch's papers stay pending for the next run
+                    self.logger.error(f"Fatal error occurred: {error}")
+                    self.fatal_error.set()
+                    return
+                summaries = None if error else parse_batch(response, len(remaining))
+                if summaries is not None:
+                    for (counter, paper, vector, _, key), summary in zip(remaining, summaries):
+                        self.record_result(counter, paper, vector, key, summary, None)
+                    return
+                # Only this batch falls back to one call per paper, so one failing paper can't fail the others
+                reason = error or "unparseable response"
+                self.logger.warning(f"Batch of {len(remaining)} papers failed ({reason}), summarizing them one at a time")
+
+            for counter, paper, vector, prompt, key in remaining:
+                # Papers left unsent stay pending in the journal for the next run
+                if self.fatal_error.is_set() or not await self.api_available():
+                    return
+                summary, error = await self.call_gemini(prompt)
+                self.record_result(counter, paper, vector, key, summary, error)
+
+    async def call_gemini(self, prompt: str) -> tuple[Optional[str], Optional[str]]:
+        # Only the API call itself is rate limited
+        if self.token_limiter:
+            await self.token_limiter.acquire(min(estimate_tokens(prompt), self.tpm))
+        async with self.limiter:
+            started = time.monotonic()
+            summary, error = await self.gemini.generate_summary_async(prompt)
+        if not error:
+            self.controller.record_success(time.monotonic() - started)
+            self.breaker.record_success()
+        elif not error.startswith(PAPER_ERRORS):
+            self.breaker.record_failure()
+        return summary, error
+
+    async def probe_api(self) -> bool:
+        return await asyncio.to_thread(self.gemini.check_api_availability)
+
+    async def api_available(self) -> bool:
+        if await self.breaker.allow(self.probe_api):
+            return True
+        if not self.fatal_error.is_set():
+            self.logger.error("Gemini API stayed unavailable, saving progress and exiting")
+            self.fatal_error.set()
+        return False
+
+    def record_result(self, counter: int, paper, vector, key: str, summary: Optional[str], error: Optional[str]) -> None:
+        if error:
+            # Fatal errors will terminate the program once in-flight requests finish
+            if error.startswith("FATAL:"):
+                self.logger.error(f"Fatal error occurred: {error}")
+                self.fatal_error.set()
+
+            # Only a failure caused by the paper itself is final; API failures leave it pending for the next run
+            elif error.startswith(PAPER_ERRORS):
+                self.logger.error(f"Error processing paper {counter + 1}/{self.total_papers}: {error}")
+                self.journal.record(paper['link'], f"Error: {error}")
+            else:
+                self.stats['api_errors'] += 1
+                self.logger.error(f"Error processing paper {counter + 1}/{self.total_papers}, leaving it for the next run: {error}")
+        else: # Successful summary
+            self.journal.record(paper['link'], summary)
+            if self.cache:
+                self.cache.set(key, summary)
+            if self.similar:
+                self.similar.add(vector, paper['link'], summary)
+            self.logger.info(f"Summarized paper {counter + 1}/{self.total_papers}: {paper['title']}")
+            self.logger.info(f"Summary: {summary[:200]}...")
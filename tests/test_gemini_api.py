@@ -0,0 +1,103 @@
+import time
+import asyncio
+from email.utils import formatdate
+from types import SimpleNamespace
+import google.api_core.exceptions
+import pytest
+from gemini_api import GeminiAPI
+
+@pytest.fixture
+def gemini(monkeypatch):
+    # Building the model doesn't contact the API, so any key will do
+    monkeypatch.setenv('AISTUDIO_GOOGLE_API_KEY', 'test-key')
+    return GeminiAPI()
+
+def rate_limited(headers=None, details=None):
+    return google.api_core.exceptions.ResourceExhausted(
+        'quota exceeded', details=details or [], response=SimpleNamespace(headers=headers or {})
+    )
+
+def test_no_wait_until_the_server_asks(gemini):
+    assert gemini._pending_wait() == 0
+    assert gemini._retry_after(rate_limited()) is None
+
+def test_retry_after_seconds(gemini):
+    wait_time = gemini._retry_after(rate_limited({'retry-after': '7'}))
+    assert 6 < wait_time <= 7
+    # Every concurrent request holds off until then
+    assert 6 < gemini._pending_wait() <= 7
+
+def test_retry_after_http_date(gemini):
+    wait_time = gemini._retry_after(rate_limited({'retry-after': formatdate(time.time() + 20, usegmt=True)}))
+    assert 18 < wait_time <= 20
+
+def test_retry_info_detail(gemini):
+    delay = SimpleNamespace(seconds=3, nanos=500_000_000)
+    assert gemini._retry_after(rate_limited(details=[SimpleNamespace(retry_delay=delay)])) == 3.5
+    assert 3 < gemini._pending_wait() <= 3.5
+
+def test_rate_limit_retries_after_the_server_hint(gemini):
+    overloads = []
+    gemini.on_overload = lambda: overloads.append(1)
+    wait_time, error = gemini._handle_error(rate_limited({'retry-after': '5'}), attempt=0)
+    assert error is None
+    assert 4 < wait_time <= 5
+    assert overloads == [1]
+
+def test_last_attempt_gives_up(gemini):
+    wait_time, error = gemini._handle_error(rate_limited({'retry-after': '5'}), attempt=gemini.MAX_RETRIES - 1)
+    assert wait_time is None
+    assert error == "Rate limit exceeded"
+
+def test_invalid_argument_is_not_retried(gemini):
+    wait_time, error = gemini._handle_error(google.api_core.exceptions.InvalidArgument('bad'), attempt=0)
+    assert wait_time is None
+    assert error.startswith("Invalid argument")
+
+def test_backoff_stays_within_the_capped_bound(gemini):
+    for attempt in range(gemini.MAX_RETRIES):
+        bound = min(gemini.RETRY_MAX_DELAY, gemini.RETRY_BASE_DELAY * 2 ** attempt)
+        assert all(0 <= gemini._backoff_delay(attempt) <= bound for _ in range(100))
+
+def test_last_retry_outlasts_the_quota_window(gemini):
+    wait_time, error = gemini._handle_error(rate_limited(), attempt=gemini.MAX_RETRIES - 2, elapsed=10.0)
+    assert error is None
+    assert wait_time >= gemini.RETRY_WINDOW - 10.0
+
+def test_earlier_retries_use_plain_backoff(gemini):
+    wait_time, _ = gemini._handle_error(rate_limited(), attempt=0, elapsed=0.0)
+    assert wait_time <= gemini.RETRY_BASE_DELAY
+
+class FakeModel:
+    """Stands in for GenerativeModel, answering every prompt and counting calls"""
+    def __init__(self):
+        self.calls = 0
+
+    async def generate_content_async(self, prompt):
+        self.calls += 1
+        return SimpleNamespace(prompt_feedback=SimpleNamespace(block_reason=None), text=f' summary {self.calls} ')
+
+def test_repeated_prompt_is_answered_from_memory(gemini):
+    gemini.model = FakeModel()
+    first = asyncio.run(gemini.generate_summary_async('prompt'))
+    second = asyncio.run(gemini.generate_summary_async('prompt'))
+    assert first == second == ('summary 1', None)
+    assert gemini.model.calls == 1
+
+def test_summary_cache_evicts_least_recently_used(gemini):
+    gemini.CACHE_SIZE = 2
+    for prompt in ('a', 'b'):
+        gemini._remember_summary(gemini.prompt_key(prompt), prompt)
+    gemini._cached_summary(gemini.prompt_key('a'))  # Touch 'a' so 'b' is the oldest
+    gemini._remember_summary(gemini.prompt_key('c'), 'c')
+    assert gemini._cached_summary(gemini.prompt_key('a')) == 'a'
+    assert gemini._cached_summary(gemini.prompt_key('b')) is None
+    assert gemini._cached_summary(gemini.prompt_key('c')) == 'c'
+
+def test_zero_cache_size_disables_the_summary_cache(monkeypatch):
+    monkeypatch.setenv('AISTUDIO_GOOGLE_API_KEY', 'test-key')
+    gemini = GeminiAPI(cache_size=0)
+    gemini.model = FakeModel()
+    for _ in range(2):
+        asyncio.run(gemini.generate_summary_async('prompt'))
+    assert gemini.model.calls == 2
@@ -0,0 +1,89 @@
+import csv
+import sqlite3
+import pytest
+from journal import PaperJournal, journal_path
+from papers_io import load_journal, merge_journal, prepare_csv, read_papers
+
+FIELDS = ['title', 'authors', 'link', 'summary']
+
+def write_csv(path, rows, fields=FIELDS):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(rows)
+
+def paper(i, **extra):
+    return dict(title=f'T{i}', authors='A', link=f'L{i}', summary=f'S{i}', **extra)
+
+def test_journal_path_keeps_extension():
+    assert journal_path('papers.csv') != journal_path('papers.parquet')
+    assert journal_path('papers.csv') != 'papers.sqlite'
+
+def test_reload_keeps_journaled_results(tmp_path):
+    journal = PaperJournal(str(tmp_path / 'j.journal.sqlite'))
+    journal.load([('L0', 'T0', 'A', 'S0', None, None)])
+    journal.record('L0', 'from journal')
+    # The CSV still has the paper unsummarized when an interrupted run is resumed
+    journal.load([('L0', 'T0', 'A', 'S0', None, None)])
+    assert journal.result('L0') == 'from journal'
+    assert journal.pending_count() == 0
+
+def test_resume_keeps_journaled_results_over_csv(tmp_path):
+    csv_file = str(tmp_path / 'papers.csv')
+    write_csv(csv_file, [paper(0, ai_abstract='from csv'), paper(1, ai_abstract=''), paper(2, ai_abstract='')],
+              FIELDS + ['ai_abstract'])
+
+    # An interrupted run left a result for L1 in the journal
+    journal = load_journal(csv_file)
+    journal.record('L1', 'from journal')
+    journal.conn.close()
+
+    journal = load_journal(csv_file)
+    assert [row['link'] for row in journal.pending()] == ['L2']
+    merge_journal(csv_file, prepare_csv(csv_file), journal)
+    journal.close(remove=True)
+
+    results = {row['link']: row['ai_abstract'] for row in read_papers(csv_file)}
+    assert results == {'L0': 'from csv', 'L1': 'from journal', 'L2': ''}
+
+def test_refuses_foreign_database(tmp_path):
+    path = tmp_path / 'papers.csv.journal.sqlite'
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE notes (text TEXT)")
+    conn.commit()
+    conn.close()
+
+    with pytest.raises(ValueError):
+        PaperJournal(str(path))
+    tables = sqlite3.connect(path).execute("SELECT name FROM sqlite_master").fetchall()
+    assert tables == [('notes',)]
+
+def test_prepare_csv_adds_columns_without_rewriting(tmp_path):
+    csv_file = tmp_path / 'papers.csv'
+    write_csv(csv_file, [paper(0)])
+    before = csv_file.read_bytes()
+    assert prepare_csv(str(csv_file)) == FIELDS + ['ai_abstract', 'ai_summary']
+    assert csv_file.read_bytes() == before
+
+def test_prepare_csv_keeps_existing_columns(tmp_path):
+    csv_file = tmp_path / 'papers.csv'
+    write_csv(csv_file, [paper(0, ai_summary='s')], FIELDS + ['ai_summary'])
+    assert prepare_csv(str(csv_file)) == FIELDS + ['ai_summary', 'ai_abstract']
+
+def test_pending_pages_by_link(tmp_path):
+    journal = PaperJournal(str(tmp_path / 'j.journal.sqlite'))
+    journal.load((f'L{i}', 'T', 'A', 'S', None, None) for i in range(5))
+    first = journal.pending(limit=2)
+    # Filling in a page doesn't shift the next one
+    journal.record(first[0]['link'], 'done')
+    rest = journal.pending(after=first[-1]['link'])
+    assert [row['link'] for row in first + rest] == ['L0', 'L1', 'L2', 'L3', 'L4']
+    assert journal.pending_count() == 4
+
+def test_summarized_papers_never_enter_the_journal(tmp_path):
+    csv_file = str(tmp_path / 'papers.csv')
+    write_csv(csv_file, [paper(0, ai_abstract='done'), paper(1, ai_abstract='')], FIELDS + ['ai_abstract'])
+    journal = load_journal(csv_file)
+    assert [row['link'] for row in journal.conn.execute("SELECT link FROM papers")] == ['L1']
+    assert journal.result('L0') is None
+    journal.close(remove=True)
@@ -0,0 +1,20 @@
+from llm_cache import LLMCache, cache_key
+
+def test_cache_key_covers_model_instructions_and_prompt():
+    key = cache_key('model', 'prompt', 'system')
+    assert key == cache_key('model', 'prompt', 'system')
+    assert key != cache_key('other model', 'prompt', 'system')
+    assert key != cache_key('model', 'other prompt', 'system')
+    assert key != cache_key('model', 'prompt', 'other system')
+
+def test_responses_persist_across_runs(tmp_path):
+    path = str(tmp_path / 'cache' / 'llm_cache.sqlite')
+    cache = LLMCache(path)
+    assert cache.get('key') is None
+    cache.set('key', 'first')
+    cache.set('key', 'second')
+    cache.close()
+
+    cache = LLMCache(path)
+    assert cache.get('key') == 'second'
+    cache.close()
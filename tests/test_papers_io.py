@@ -0,0 +1,38 @@
+import pytest
+pa = pytest.importorskip('pyarrow')
+import pyarrow.parquet as pq
+import papers_io
+from papers_io import load_journal, merge_journal, prepare_csv
+
+def test_parquet_merge_round_trip(tmp_path, monkeypatch):
+    # Several record batches each way
+    monkeypatch.setattr(papers_io, 'PARQUET_BATCH_ROWS', 2)
+    parquet_file = str(tmp_path / 'papers.parquet')
+    pq.write_table(pa.table({
+        'title': [f'T{i}' for i in range(5)],
+        'authors': ['A'] * 5,
+        'link': [f'L{i}' for i in range(5)],
+        'summary': [f'S{i}' for i in range(5)],
+        'citations': pa.array(range(5), type=pa.int64()),
+    }), parquet_file)
+
+    fieldnames = prepare_csv(parquet_file)
+    journal = load_journal(parquet_file)
+    assert journal.pending_count() == 5
+    journal.record('L1', 'summary 1')
+    journal.record('L4', 'summary 4')
+    merge_journal(parquet_file, fieldnames, journal)
+    journal.close(remove=True)
+
+    table = pq.read_table(parquet_file)
+    assert table.column_names == fieldnames
+    assert table.schema.field('citations').type == pa.int64()
+    assert table.schema.field('ai_abstract').type == pa.string()
+    assert table.column('ai_abstract').to_pylist() == [None, 'summary 1', None, None, 'summary 4']
+    assert table.column('citations').to_pylist() == list(range(5))
+    assert not (tmp_path / 'papers.parquet.tmp').exists()
+
+    # A second run only picks up the papers still missing a summary
+    journal = load_journal(parquet_file)
+    assert [row['link'] for row in journal.pending()] == ['L0', 'L2', 'L3']
+    journal.close(remove=True)
@@ -0,0 +1,37 @@
+from prompts import MAX_ABSTRACT_CHARS, TRUNCATED_MARKER, batch_prompt, cap_abstract, paper_prompt, parse_batch
+
+def test_parse_batch_plain_json():
+    assert parse_batch('["one", " two "]', 2) == ['one', 'two']
+
+def test_parse_batch_fenced_block():
+    response = 'Here you go:\n```json\n["first", "second"]\n```\n'
+    assert parse_batch(response, 2) == ['first', 'second']
+
+def test_parse_batch_wrong_count():
+    assert parse_batch('["only one"]', 2) is None
+
+def test_parse_batch_non_strings():
+    assert parse_batch('["fine", 3]', 2) is None
+    assert parse_batch('{"a": "b"}', 1) is None
+
+def test_parse_batch_not_json():
+    assert parse_batch('Unable to summarize', 1) is None
+
+def test_cap_abstract_keeps_short_text():
+    assert cap_abstract('  short abstract  ') == ('short abstract', False)
+    assert cap_abstract(None) == ('', False)
+
+def test_cap_abstract_truncates_long_text():
+    abstract, truncated = cap_abstract('x' * (MAX_ABSTRACT_CHARS + 10))
+    assert truncated
+    assert abstract == 'x' * MAX_ABSTRACT_CHARS + TRUNCATED_MARKER
+
+def test_paper_prompt_fills_every_field():
+    prompt = paper_prompt({'title': 'T', 'authors': 'A; B', 'summary': 'S {not a field}'})
+    assert prompt == 'Title: T\nAuthors: A; B\nOriginal Abstract: S {not a field}\n'
+
+def test_batch_prompt_numbers_papers_in_order():
+    papers = [{'title': f'T{i}', 'authors': 'A', 'summary': f'S{i}'} for i in range(3)]
+    prompt = batch_prompt(papers)
+    assert 'exactly 3 strings' in prompt
+    assert prompt.index('[Paper 1]\nTitle: T0') < prompt.index('[Paper 2]\nTitle: T1') < prompt.index('[Paper 3]\nTitle: T2')
@@ -0,0 +1,135 @@
+import time
+import asyncio
+import pytest
+from rate_limiter import TokenBucket, AIMDController, CircuitBreaker
+
+def test_token_bucket_allows_burst_then_paces():
+    async def run():
+        bucket = TokenBucket(5, period=0.5)
+        started = time.monotonic()
+        for _ in range(5):
+            await bucket.acquire()
+        burst = time.monotonic() - started
+        await bucket.acquire()
+        return burst, time.monotonic() - started
+
+    burst, total = asyncio.run(run())
+    assert burst < 0.05
+    assert total >= 0.09  # One more token takes period / rate
+
+def test_token_bucket_clamps_oversized_requests():
+    async def run():
+        bucket = TokenBucket(10, period=0.2)
+        # A prompt estimated above the whole TPM quota waits for a full bucket instead of forever
+        await bucket.acquire(1000)
+        return bucket._tokens
+
+    assert asyncio.run(asyncio.wait_for(run(), timeout=1)) < 1
+
+def test_token_bucket_rejects_zero_rate():
+    with pytest.raises(ValueError):
+        TokenBucket(0)
+
+def test_aimd_grows_under_target_and_halves_on_overload():
+    controller = AIMDController(initial=2, maximum=4, target_latency=1.0, increase=1.0)
+    controller.record_success(0.1)
+    controller.record_success(0.1)
+    assert controller.limit == 4
+    controller.record_success(0.1)
+    assert controller.limit == 4  # Capped at maximum
+    controller.record_overload()
+    assert controller.limit == 2
+    for _ in range(5):
+        controller.record_overload()
+    assert controller.limit == controller.minimum
+
+def run_through(controller, count, on_enter=None):
+    """Push `count` requests through the controller, returning the most seen in flight at once"""
+    async def run():
+        in_flight = peak = 0
+
+        async def request(i):
+            nonlocal in_flight, peak
+            async with controller:
+                in_flight += 1
+                peak = max(peak, in_flight)
+                if on_enter:
+                    on_enter(i)
+                await asyncio.sleep(0.001)
+                in_flight -= 1
+
+        await asyncio.gather(*(request(i) for i in range(count)))
+        return peak
+
+    return asyncio.run(run())
+
+def test_aimd_limits_requests_in_flight():
+    assert run_through(AIMDController(initial=2, maximum=2), 20) == 2
+
+def test_aimd_picks_up_a_raised_limit():
+    controller = AIMDController(initial=1, maximum=4, increase=1.0)
+    # Waiters queued behind a limit of 1 still get the slots added while they wait
+    assert run_through(controller, 40, on_enter=lambda i: controller.record_success(0.1)) == 4
+
+def test_aimd_scales_to_many_waiters():
+    # A chunk of pending papers queues up to 10,000 requests on the controller at once
+    started = time.monotonic()
+    assert run_through(AIMDController(initial=16, maximum=16), 10_000) == 16
+    assert time.monotonic() - started < 5
+
+def probe_returning(*results):
+    """Async probe that returns the given results in order, counting calls"""
+    calls = []
+
+    async def probe():
+        calls.append(1)
+        return results[len(calls) - 1]
+
+    return probe, calls
+
+def test_circuit_breaker_opens_after_fail_max():
+    async def run():
+        breaker = CircuitBreaker(fail_max=3, reset_timeout=0, max_probes=1)
+        probe, calls = probe_returning(True)
+        for _ in range(2):
+            breaker.record_failure()
+        assert await breaker.allow(probe)
+        assert not calls  # Still closed, no probe needed
+        breaker.record_failure()
+        assert await breaker.allow(probe)
+        return calls
+
+    assert len(asyncio.run(run())) == 1
+
+def test_circuit_breaker_closes_on_good_probe():
+    async def run():
+        breaker = CircuitBreaker(fail_max=1, reset_timeout=0, max_probes=3)
+        probe, calls = probe_returning(False, True)
+        breaker.record_failure()
+        assert await breaker.allow(probe)
+        assert breaker.failures == 0
+        assert await breaker.allow(probe)  # Closed again, no further probes
+        return calls
+
+    assert len(asyncio.run(run())) == 2
+
+def test_circuit_breaker_success_resets_failure_count():
+    breaker = CircuitBreaker(fail_max=2)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker._closed.is_set()
+
+def test_circuit_breaker_gives_up_after_max_probes():
+    async def run():
+        breaker = CircuitBreaker(fail_max=1, reset_timeout=0, max_probes=2)
+        probe, calls = probe_returning(False, False)
+        breaker.record_failure()
+        waiters = await asyncio.gather(*(breaker.allow(probe) for _ in range(3)))
+        # Once given up it never probes again
+        assert not await breaker.allow(probe)
+        return waiters, calls
+
+    waiters, calls = asyncio.run(run())
+    assert waiters == [False, False, False]
+    assert len(calls) == 2
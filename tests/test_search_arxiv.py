@@ -0,0 +1,153 @@
+import gzip
+import io
+import sys
+import time
+import asyncio
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+import search_arxiv
+
+ENTRY = """<entry>
+  <id>http://arxiv.org/abs/{n}</id>
+  <title>Paper {n}</title>
+  <summary>Abstract {n}</summary>
+  <author><name>Author {n}</name></author>
+  <published>2024-01-01T00:00:00Z</published>
+  <updated>2024-01-02T00:00:00Z</updated>
+</entry>"""
+
+def feed(start, count):
+    entries = ''.join(ENTRY.format(n=n) for n in range(start, start + count))
+    return f'<feed xmlns="http://www.w3.org/2005/Atom">{entries}</feed>'.encode('utf-8')
+
+class FeedHandler(BaseHTTPRequestHandler):
+    """Serves `max_results` entries from `start`, gzipped when asked, with an ETag for revalidation"""
+    def do_GET(self):
+        query = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)
+        self.server.requests.append(dict(self.headers, start=query.get('start', ['0'])[0], at=time.monotonic()))
+        if self.server.etag and self.headers.get('If-None-Match') == self.server.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        body = feed(int(query.get('start', ['0'])[0]), int(query.get('max_results', ['3'])[0]))
+        self.send_response(200)
+        if 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = gzip.compress(body)
+            self.send_header('Content-Encoding', 'gzip')
+        if self.server.etag:
+            self.send_header('ETag', self.server.etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), FeedHandler)
+    httpd.requests = []
+    httpd.etag = None
+    httpd.url = f'http://127.0.0.1:{httpd.server_address[1]}/api/query?start=0&max_results=3'
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+@pytest.fixture(autouse=True)
+def cache_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(search_arxiv, 'CACHE_PATH', str(tmp_path / 'responses'))
+
+class FakeResponse(io.BytesIO):
+    def __init__(self, body, headers):
+        super().__init__(body)
+        self.headers = headers
+
+def test_gzip_bodies_are_decoded():
+    stream = search_arxiv._decoded(FakeResponse(gzip.compress(b'<feed/>'), {'Content-Encoding': 'gzip'}))
+    assert stream.read() == b'<feed/>'
+
+def test_plain_bodies_pass_through():
+    response = FakeResponse(b'<feed/>', {})
+    assert search_arxiv._decoded(response) is response
+
+def test_gzipped_feed_parses(server):
+    papers = list(search_arxiv.iter_arxiv_entries(server.url, use_cache=False))
+    assert server.requests[0]['Accept-Encoding'] == 'gzip'
+    assert [paper['title'] for paper in papers] == ['Paper 0', 'Paper 1', 'Paper 2']
+
+@pytest.fixture
+def paged(server, monkeypatch):
+    """Point query URLs at the local server and shorten the spacing between requests"""
+    base = f'http://127.0.0.1:{server.server_address[1]}/api/query?'
+    build = search_arxiv.build_query_url
+    monkeypatch.setattr(search_arxiv, 'build_query_url', lambda *args: build(*args).replace(
+        'http://export.arxiv.org/api/query?', base))
+    monkeypatch.setattr(search_arxiv, 'REQUEST_INTERVAL', 0.1)
+    return server
+
+def check_pages(server, papers):
+    assert [paper['title'] for paper in papers] == [f'Paper {n}' for n in range(2, 9)]
+    requests = sorted(server.requests, key=lambda request: request['at'])
+    assert [request['start'] for request in requests] == ['2', '5', '8']
+    # Request starts stay REQUEST_INTERVAL apart even though pages overlap
+    assert all(b['at'] - a['at'] >= 0.09 for a, b in zip(requests, requests[1:]))
+
+def test_pages_with_aiohttp(paged):
+    pytest.importorskip('aiohttp')
+    check_pages(paged, asyncio.run(search_arxiv.query_arxiv_pages('all:rocks', 7, page_size=3, start=2, use_cache=False)))
+
+def test_pages_in_threads(paged, monkeypatch):
+    monkeypatch.setattr(search_arxiv, 'aiohttp', None)
+    check_pages(paged, asyncio.run(search_arxiv.query_arxiv_pages('all:rocks', 7, page_size=3, start=2, use_cache=False)))
+
+def test_page_size_must_be_positive(monkeypatch):
+    monkeypatch.setattr(sys, 'argv', ['search_arxiv', 'all:rocks', '--page_size', '0'])
+    with pytest.raises(SystemExit) as exit_info:
+        search_arxiv.main()
+    assert exit_info.value.code == 2
+
+def test_caching_reader_saves_the_body_once_read_to_the_end():
+    saved = []
+    reader = search_arxiv._CachingReader(io.BytesIO(b'abcdefgh'), saved.append)
+    assert reader.read(3) == b'abc'
+    assert not saved  # Not complete yet
+    while reader.read(3):
+        pass
+    reader.read(3)
+    assert saved == [b'abcdefgh']
+
+def test_caching_reader_read_all():
+    saved = []
+    assert search_arxiv._CachingReader(io.BytesIO(b'body'), saved.append).read() == b'body'
+    assert saved == [b'body']
+
+def test_unchanged_response_is_replayed_from_cache(server):
+    server.etag = '"v1"'
+    first = list(search_arxiv.iter_arxiv_entries(server.url))
+    second = list(search_arxiv.iter_arxiv_entries(server.url))
+    assert second == first
+    assert 'If-None-Match' not in server.requests[0]
+    assert server.requests[1]['If-None-Match'] == '"v1"'
+
+def test_unchanged_page_is_replayed_from_cache(server):
+    aiohttp = pytest.importorskip('aiohttp')
+    server.etag = '"v1"'
+
+    async def fetch():
+        async with aiohttp.ClientSession() as session:
+            return [await search_arxiv._fetch_page(session, server.url) for _ in range(2)]
+
+    first, second = asyncio.run(fetch())
+    assert len(first) == 3 and second == first
+    assert server.requests[1]['If-None-Match'] == '"v1"'
+
+def test_no_cache_skips_revalidation(server):
+    server.etag = '"v1"'
+    list(search_arxiv.iter_arxiv_entries(server.url))
+    list(search_arxiv.iter_arxiv_entries(server.url, use_cache=False))
+    assert 'If-None-Match' not in server.requests[1]
@@ -0,0 +1,91 @@
+import sqlite3
+import pytest
+faiss = pytest.importorskip('faiss')
+np = pytest.importorskip('numpy')
+import semantic_cache
+from semantic_cache import SemanticCache
+
+DIMENSION = 4
+
+class FakeEncoder:
+    """Stands in for the sentence-transformers model; the tests pass vectors in directly"""
+    def __init__(self, model_name):
+        pass
+
+    def get_sentence_embedding_dimension(self):
+        return DIMENSION
+
+@pytest.fixture(autouse=True)
+def encoder(monkeypatch):
+    # faiss is enough for the index; the encoder is only needed to embed real abstracts
+    monkeypatch.setattr(semantic_cache, 'faiss', faiss)
+    monkeypatch.setattr(semantic_cache, 'np', np, raising=False)
+    monkeypatch.setattr(semantic_cache, 'SentenceTransformer', FakeEncoder)
+
+def unit(i):
+    vector = np.zeros(DIMENSION, dtype='float32')
+    vector[i] = 1
+    return vector
+
+def open_cache(tmp_path, **kwargs):
+    return SemanticCache(str(tmp_path / 'semantic_cache'), threshold=0.9, **kwargs)
+
+def test_reuses_only_near_duplicates(tmp_path):
+    cache = open_cache(tmp_path)
+    assert cache.lookup(unit(0)) is None
+    cache.add(unit(0), 'L0', 'summary 0')
+    assert cache.lookup(unit(0) + 0.01 * unit(1)) == 'summary 0'
+    assert cache.lookup(unit(1)) is None
+    cache.close()
+
+def test_entries_survive_a_crash_before_the_index_is_saved(tmp_path):
+    cache = open_cache(tmp_path, save_every=2)
+    for i in range(3):
+        cache.add(unit(i), f'L{i}', f'summary {i}')
+    # Killed after the second entry's save, before close could save the third
+    cache.conn.close()
+
+    cache = open_cache(tmp_path)
+    assert cache.index.ntotal == 3
+    assert [cache.lookup(unit(i)) for i in range(3)] == ['summary 0', 'summary 1', 'summary 2']
+    cache.close()
+
+def test_runs_sharing_a_cache_keep_each_others_entries(tmp_path):
+    first, second = open_cache(tmp_path), open_cache(tmp_path)
+    first.add(unit(0), 'L0', 'summary 0')
+    second.add(unit(1), 'L1', 'summary 1')
+    first.add(unit(2), 'L2', 'summary 2')
+    assert second.lookup(unit(1)) == 'summary 1'
+    # Whichever index is saved last misses the other run's entries until the next open
+    first.close()
+    second.close()
+
+    cache = open_cache(tmp_path)
+    assert [cache.lookup(unit(i)) for i in range(3)] == ['summary 0', 'summary 1', 'summary 2']
+    cache.close()
+
+def test_unusable_index_is_rebuilt_from_sqlite(tmp_path):
+    cache = open_cache(tmp_path)
+    cache.add(unit(0), 'L0', 'summary 0')
+    cache.close()
+    # An index from an older version, without entry ids
+    faiss.write_index(faiss.IndexFlatIP(DIMENSION), str(tmp_path / 'semantic_cache.faiss'))
+
+    cache = open_cache(tmp_path)
+    assert cache.lookup(unit(0)) == 'summary 0'
+    cache.close()
+
+def test_index_ahead_of_sqlite_is_rebuilt(tmp_path):
+    cache = open_cache(tmp_path)
+    cache.add(unit(0), 'L0', 'summary 0')
+    cache.add(unit(1), 'L1', 'summary 1')
+    cache.close()
+    conn = sqlite3.connect(tmp_path / 'semantic_cache.sqlite')
+    conn.execute("DELETE FROM entries WHERE link = 'L1'")
+    conn.commit()
+    conn.close()
+
+    cache = open_cache(tmp_path)
+    assert cache.index.ntotal == 1
+    assert cache.lookup(unit(1)) is None
+    cache.close()
@@ -0,0 +1,19 @@
+import sys
+import pytest
+import summarize_papers
+
+@pytest.mark.parametrize('option', ['--rpm', '--concurrency', '--max_concurrency', '--batch_size'])
+@pytest.mark.parametrize('value', ['0', '-1'])
+def test_rejects_counts_below_one(option, value, monkeypatch, capsys):
+    monkeypatch.setattr(sys, 'argv', ['summarize_papers', '--csv_file', 'papers.csv', option, value])
+    with pytest.raises(SystemExit) as exit_info:
+        summarize_papers.main()
+    assert exit_info.value.code == 2
+    assert 'must be at least 1' in capsys.readouterr().err
+
+def test_rejects_negative_tpm(monkeypatch, capsys):
+    monkeypatch.setattr(sys, 'argv', ['summarize_papers', '--csv_file', 'papers.csv', '--tpm', '-1'])
+    with pytest.raises(SystemExit) as exit_info:
+        summarize_papers.main()
+    assert exit_info.value.code == 2
+    assert 'must be at least 0' in capsys.readouterr().err
@@ -0,0 +1,133 @@
+import json
+import asyncio
+import logging
+from journal import PaperJournal
+from rate_limiter import CircuitBreaker
+from summarizer import Summarizer
+
+ABSTRACT = 'An abstract long enough to be worth summarizing, about rocks. '
+
+class FakeGemini:
+    """Answers batch prompts with a JSON array and single prompts with text, failing on chosen titles"""
+    MODEL_NAME = 'fake'
+
+    def __init__(self, fail=None, error='Response blocked: SAFETY', available=True):
+        self.fail = fail
+        self.error = error
+        self.available = available
+        self.prompts = []
+        self.on_overload = None
+
+    def check_api_availability(self):
+        return self.available
+
+    async def generate_summary_async(self, prompt):
+        self.prompts.append(prompt)
+        if self.fail and self.fail in prompt:
+            return None, self.error
+        titles = [line[len('Title: '):] for line in prompt.splitlines() if line.startswith('Title: ')]
+        if 'JSON array' in prompt:
+            return json.dumps([f'summary of {title}' for title in titles]), None
+        return f'summary of {titles[0]}', None
+
+def make_journal(tmp_path, count):
+    journal = PaperJournal(str(tmp_path / 'papers.csv.journal.sqlite'))
+    journal.load((f'L{i}', f'T{i}', 'A', ABSTRACT, None, None) for i in range(count))
+    return journal
+
+def make_summarizer(gemini, journal, batch_size=1):
+    return Summarizer(gemini, journal, logging.getLogger('test'), rpm=6000, batch_size=batch_size)
+
+def run(gemini, journal, batch_size=1):
+    summarizer = make_summarizer(gemini, journal, batch_size)
+    asyncio.run(summarizer.run())
+    return summarizer
+
+def results(journal):
+    return dict(journal.conn.execute("SELECT link, ai_abstract FROM papers ORDER BY link").fetchall())
+
+def test_paper_errors_are_final(tmp_path):
+    journal = make_journal(tmp_path, 3)
+    run(FakeGemini(fail='T1'), journal)
+    assert results(journal)['L1'] == 'Error: Response blocked: SAFETY'
+    assert journal.pending_count() == 0
+
+def test_api_errors_stay_pending(tmp_path):
+    journal = make_journal(tmp_path, 3)
+    summarizer = run(FakeGemini(fail='T1', error='Rate limit exceeded'), journal)
+    assert results(journal) == {'L0': 'summary of T0', 'L1': None, 'L2': 'summary of T2'}
+    assert summarizer.stats['api_errors'] == 1
+
+def test_dead_api_leaves_every_paper_pending(tmp_path):
+    journal = make_journal(tmp_path, 10)
+    gemini = FakeGemini(fail='Title', error='503 Service Unavailable', available=False)
+    summarizer = make_summarizer(gemini, journal)
+    summarizer.breaker = CircuitBreaker(fail_max=2, reset_timeout=0, max_probes=1)
+    asyncio.run(summarizer.run())
+    assert summarizer.fatal_error.is_set()
+    assert journal.pending_count() == 10
+
+def test_batch_is_one_request(tmp_path):
+    journal = make_journal(tmp_path, 4)
+    gemini = FakeGemini()
+    run(gemini, journal, batch_size=4)
+    assert len(gemini.prompts) == 1
+    assert results(journal) == {f'L{i}': f'summary of T{i}' for i in range(4)}
+
+def test_batch_error_falls_back_to_single_papers(tmp_path):
+    journal = make_journal(tmp_path, 4)
+    gemini = FakeGemini(fail='T2')
+    run(gemini, journal, batch_size=4)
+    assert len(gemini.prompts) == 5  # The failed batch, then one request per paper
+    assert results(journal) == {
+        'L0': 'summary of T0', 'L1': 'summary of T1', 'L2': 'Error: Response blocked: SAFETY', 'L3': 'summary of T3'
+    }
+
+def test_unparseable_batch_falls_back_to_single_papers(tmp_path):
+    journal = make_journal(tmp_path, 3)
+    gemini = FakeGemini()
+    summarizer = make_summarizer(gemini, journal, batch_size=3)
+    answer = gemini.generate_summary_async
+
+    async def no_json(prompt):
+        summary, error = await answer(prompt)
+        return ('Sorry, here are the summaries in prose.' if 'JSON array' in prompt else summary), error
+
+    gemini.generate_summary_async = no_json
+    asyncio.run(summarizer.run())
+    assert len(gemini.prompts) == 4
+    assert results(journal) == {f'L{i}': f'summary of T{i}' for i in range(3)}
+
+def test_fatal_batch_error_leaves_papers_pending(tmp_path):
+    journal = make_journal(tmp_path, 3)
+    gemini = FakeGemini(fail='T1', error='FATAL: API key revoked')
+    summarizer = run(gemini, journal, batch_size=3)
+    assert summarizer.fatal_error.is_set()
+    assert len(gemini.prompts) == 1
+    assert journal.pending_count() == 3
+
+def test_works_through_the_journal_in_chunks(tmp_path, monkeypatch):
+    monkeypatch.setattr('summarizer.PENDING_CHUNK', 2)
+    journal = make_journal(tmp_path, 5)
+    gemini = FakeGemini()
+    run(gemini, journal, batch_size=2)
+    assert len(gemini.prompts) == 3  # One batch per chunk
+    assert journal.pending_count() == 0
+
+def test_short_abstracts_are_skipped_without_a_request(tmp_path):
+    journal = PaperJournal(str(tmp_path / 'papers.csv.journal.sqlite'))
+    journal.load([('L0', 'T0', 'A', 'tiny', None, None)])
+    gemini = FakeGemini()
+    summarizer = run(gemini, journal)
+    assert not gemini.prompts
+    assert results(journal) == {'L0': 'Unable to summarize'}
+    assert summarizer.stats['too_short'] == 1
+
+def test_long_abstracts_are_capped_in_the_prompt(tmp_path):
+    journal = PaperJournal(str(tmp_path / 'papers.csv.journal.sqlite'))
+    journal.load([('L0', 'T0', 'A', 'x' * 10_000, None, None)])
+    gemini = FakeGemini()
+    summarizer = run(gemini, journal)
+    assert '[abstract truncated]' in gemini.prompts[0]
+    assert len(gemini.prompts[0]) < 5_000
+    assert summarizer.stats['truncated'] == 1